@@ -5,13 +5,416 @@
 支持将同一企微账户的多个源日历分别同步到不同的iCloud目标日历
 """
 
+import os
 import time
+import asyncio
+import hashlib
+import random
+import statistics
 import logging
-import copy
-from typing import Dict, List, Optional
+from collections import ChainMap
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 from cal_sync import CalSync
 
 
+@dataclass(frozen=True)
+class BatchMapping:
+    """经过校验的单个批量映射：EventKit源日历索引 → iCloud目标日历"""
+    source_index: int
+    target: str
+    state_path: str = field(init=False, compare=False, repr=False)
+    
+    def __post_init__(self):
+        # 用目标日历名的哈希作为状态文件名，避免"Work A"与"Work_A"这类名称映射到同一文件
+        digest = hashlib.blake2b(self.target.encode("utf-8"), digest_size=8).hexdigest()
+        object.__setattr__(self, "state_path", f"logs/sync_state_batch_{self.source_index}_{digest}.json")
+    
+    @property
+    def legacy_state_path(self) -> str:
+        """旧版本使用的状态文件路径（空格替换为下划线）"""
+        return f"logs/sync_state_batch_{self.source_index}_{self.target.replace(' ', '_')}.json"
+
+
+@dataclass
+class MappingResult:
+    """单个映射的执行结果"""
+    index: int
+    mapping: BatchMapping
+    ok: bool
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+
+def _validate_mappings(eventkit_batch_map: List[Dict]) -> List[BatchMapping]:
+    """
+    单次遍历校验并去重批量映射配置
+    
+    无效映射（缺少source_index或target_icloud_calendar_name）和重复映射各记录一次日志后跳过，
+    保留首次出现的顺序。
+    
+    Args:
+        eventkit_batch_map: 批量映射配置
+        
+    Returns:
+        List[BatchMapping]: 有效且去重后的映射列表
+    """
+    logger = logging.getLogger(__name__)
+    seen = set()
+    validated = []
+    for i, mapping in enumerate(eventkit_batch_map, 1):
+        source_index = mapping.get("source_index") if isinstance(mapping, dict) else None
+        target_calendar = mapping.get("target_icloud_calendar_name") if isinstance(mapping, dict) else None
+        if not source_index or not target_calendar:
+            logger.error("映射 %d 配置无效：缺少source_index或target_icloud_calendar_name", i)
+            continue
+        
+        m = BatchMapping(source_index, target_calendar)
+        if m in seen:
+            logger.warning("映射 %d 与之前的映射重复（EventKit索引 %s → iCloud日历「%s」），已跳过", i, source_index, target_calendar)
+            continue
+        seen.add(m)
+        validated.append(m)
+    return validated
+
+
+class _AsyncRateLimiter:
+    """
+    异步令牌桶限流器：每 time_period 秒最多放行 max_rate 次调用
+    
+    令牌按固定速率连续补充，空闲时可累积至 max_rate 个，因此轻量映射不会被无谓地暂停，
+    突发调用则被平滑到配置的速率上限。
+    """
+    
+    def __init__(self, max_rate: float, time_period: float = 60.0):
+        self.max_rate = float(max_rate)
+        self.time_period = float(time_period)
+        self._rate = self.max_rate / self.time_period
+        self._tokens = self.max_rate
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """获取一个令牌，令牌不足时等待补充"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.max_rate, self._tokens + (now - self._last) * self._rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+    
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+async def _retry_with_backoff(call, attempts: int, label: str, initial: float = 2.0, max_wait: float = 60.0) -> bool:
+    """
+    带指数退避和随机抖动的重试
+    
+    调用返回False或抛出异常时视为失败，第n次失败后等待 uniform(0, min(max_wait, initial * 2^(n-1))) 秒，
+    把瞬时的限流/连接抖动变成短暂延迟而不是整个映射失败。只用于可安全重复的连接阶段，
+    不用于会写入iCloud的同步操作（force_resync会清空并重建目标日历）。
+    
+    Args:
+        call: 无参协程函数，返回bool
+        attempts: 最大尝试次数
+        label: 日志中使用的描述
+        initial: 初始退避秒数
+        max_wait: 单次最长退避秒数
+        
+    Returns:
+        bool: 最终是否成功；最后一次尝试抛出的异常会继续向上抛出
+    """
+    logger = logging.getLogger(__name__)
+    for attempt in range(1, attempts + 1):
+        try:
+            if await call():
+                return True
+            reason = "返回失败"
+        except Exception as e:
+            if attempt >= attempts:
+                raise
+            reason = f"异常：{e}"
+        
+        if attempt >= attempts:
+            return False
+        delay = random.uniform(0, min(max_wait, initial * (2 ** (attempt - 1))))
+        logger.warning("%s第 %d/%d 次尝试%s，%.1f 秒后重试", label, attempt, attempts, reason, delay)
+        await asyncio.sleep(delay)
+    return False
+
+
+def _load_mapping_state(base: CalSync, mapping: BatchMapping) -> Dict:
+    """
+    加载映射的同步状态；新路径不存在时回退读取旧版本路径，
+    避免升级后丢失状态而在iCloud中重复创建所有事件（之后保存到新路径）
+    """
+    if not os.path.exists(mapping.state_path) and os.path.exists(mapping.legacy_state_path):
+        return base.load_sync_state(mapping.legacy_state_path)
+    return base.load_sync_state(mapping.state_path)
+
+
+def _preload_sync_states(base: CalSync, mappings: List[BatchMapping]):
+    """
+    并行预加载所有映射的同步状态文件到基础同步器的状态缓存
+    
+    Args:
+        base: 基础同步器
+        mappings: 已校验的映射列表
+    """
+    if not mappings:
+        return
+    with ThreadPoolExecutor(max_workers=min(8, len(mappings))) as ex:
+        states = ex.map(lambda m: _load_mapping_state(base, m), mappings)
+        base._state_cache.update(zip((m.state_path for m in mappings), states))
+
+
+def _create_base_syncer(config: Dict) -> CalSync:
+    """
+    创建本轮批量同步共享的基础同步器（只构造一次，供各映射复制使用）
+    
+    Args:
+        config: 配置字典
+        
+    Returns:
+        CalSync: 基础同步器
+    """
+    original_config_file = config.get("_config_file", "config.json")
+    base = CalSync(config_file=original_config_file, caldav_indices=[], eventkit_calendars=[], eventkit_indices=[])
+    # 本轮运行范围内的同步状态缓存：状态文件路径 -> 状态字典
+    base._state_cache = {}
+    return base
+
+
+def _prepare_syncer(base: CalSync, config: Dict, mapping: BatchMapping) -> CalSync:
+    """
+    基于共享的基础同步器为单个映射派生同步器（单源单目标模式）
+    
+    通过CalSync._derive派生同步器：只共享已建立的CalDAV连接，解析缓存、快照和iCloud客户端
+    （与目标日历绑定）都是各映射独立的；同步状态从基础同步器的_state_cache中取得。
+    
+    Args:
+        base: 基础同步器
+        config: 配置字典
+        mapping: 已校验的映射
+        
+    Returns:
+        CalSync: 已加载独立同步状态的同步器
+    """
+    source_index, target_calendar = mapping.source_index, mapping.target
+    
+    # 覆盖配置：单源单目标模式。只构造需要覆盖的键，其余键通过ChainMap共享原配置，
+    # icloud子字典重新构造而非原地修改，避免并发映射之间互相覆盖目标日历
+    overrides = {
+        "source_routing": {
+            "eventkit_indices": [source_index],  # 只使用当前映射的单个索引
+            "caldav_indices": [],               # 强制忽略CalDAV
+            "eventkit_calendars": [],           # 清空EventKit日历名称
+            "fallback_on_404": False            # 禁用CalDAV回退
+        },
+        "icloud": {**config.get("icloud", {}), "calendar_name": target_calendar}  # 设置目标iCloud日历
+    }
+    batch_config = ChainMap(overrides, config)
+    
+    syncer = base._derive(batch_config)
+    
+    # 为每个映射创建独立的同步状态文件，避免状态冲突
+    syncer.sync_state_file = mapping.state_path
+    state = base._state_cache.get(mapping.state_path)
+    if state is None:
+        state = _load_mapping_state(base, mapping)
+        base._state_cache[mapping.state_path] = state
+    syncer.sync_state = state
+    return syncer
+
+
+async def iter_batch_results(config: Dict, mappings: List[BatchMapping], force_resync: bool = False) -> AsyncIterator[MappingResult]:
+    """
+    并发执行所有映射，并按完成顺序逐个产出结果
+    
+    各映射之间相互独立（独立的目标日历和状态文件），阻塞的同步调用放入线程执行，
+    总耗时由最慢的映射决定，而不是各映射耗时之和。访问iCloud的调用统一经过
+    并发信号量和令牌桶限流器，取代原先映射之间固定的错峰暂停。信号量只限制同时处于iCloud阶段的映射数，
+    各映射的CalDAV/EventKit读取可以并行；其中的AppleScript调用由icloud_integration的进程级锁依次执行。
+    每个映射完成后立即产出结果并释放其同步器，由调用方负责汇总。
+    
+    Args:
+        config: 配置字典
+        mappings: 已校验的映射列表
+        force_resync: 是否执行强制重新同步
+        
+    Yields:
+        MappingResult: 单个映射的执行结果
+    """
+    logger = logging.getLogger(__name__)
+    total_count = len(mappings)
+    sync_config = config.get("sync", {})
+    
+    # 限流器和信号量绑定到当前事件循环，因此每次运行时创建
+    icloud_limiter = _AsyncRateLimiter(sync_config.get("icloud_rate_per_min", 300), 60)
+    icloud_sem = asyncio.Semaphore(sync_config.get("icloud_max_concurrent", 10))
+    retry_attempts = max(1, int(sync_config.get("batch_retry_attempts", 5)))
+    
+    async def limited(func, *args):
+        """
+        在并发和速率限制下于线程中执行一次映射级的iCloud操作
+        
+        令牌按操作（连接检查、增量同步、强制重新同步）获取，而不是按其内部的每次AppleScript调用获取
+        """
+        async with icloud_sem, icloud_limiter:
+            return await asyncio.to_thread(func, *args)
+    
+    # 同一轮运行中指向同一账户和目标日历的iCloud连接请求合并为一次：(用户名, 目标日历) -> Future
+    connect_futures: Dict[Tuple[str, str], asyncio.Future] = {}
+    
+    async def coalesced_connect_icloud(syncer: CalSync) -> bool:
+        """合并并发的iCloud连接请求，只有第一个请求真正执行连接检查，其余等待其结果"""
+        icloud_config = syncer.config.get("icloud", {})
+        key = (icloud_config.get("username"), icloud_config.get("calendar_name"))
+        future = connect_futures.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            connect_futures[key] = future
+            try:
+                ok = await _retry_with_backoff(
+                    lambda: limited(syncer.connect_icloud),
+                    retry_attempts, f"iCloud日历「{key[1]}」连接"
+                )
+                future.set_result((ok, syncer.icloud_client))
+            except Exception as e:
+                future.set_exception(e)
+                raise
+            return ok
+        
+        ok, client = await future
+        syncer.icloud_client = client
+        return ok
+    
+    # 构造一次基础同步器并只建立一次CalDAV连接，各映射复用
+    base = await asyncio.to_thread(_create_base_syncer, config)
+    try:
+        await asyncio.to_thread(_preload_sync_states, base, mappings)
+        if not await _retry_with_backoff(lambda: limited(base.connect_caldav), retry_attempts, "CalDAV连接"):
+            logger.error("❌ CalDAV连接失败，本轮批量同步的所有映射均无法执行")
+            for i, mapping in enumerate(mappings, 1):
+                yield MappingResult(index=i, mapping=mapping, ok=False, error="CalDAV连接失败")
+            return
+        # connect_caldav会作废日历列表缓存：在派生各映射的同步器之前查询一次，
+        # 派生的同步器共享该列表及索引，不再各自在共享会话上并发查询
+        try:
+            await asyncio.to_thread(base._get_calendars)
+        except Exception as e:
+            logger.warning("预先获取CalDAV日历列表失败，各映射将分别获取：%s", e)
+        
+        async def sync_one(i: int, mapping: BatchMapping) -> bool:
+            source_index = mapping.source_index
+            target_calendar = mapping.target
+            
+            logger.info("-" * 40)
+            sync_mode = "强制重新同步" if force_resync else "增量同步"
+            logger.info("🔄 执行映射 %d/%d: EventKit索引 %s → iCloud日历「%s」(%s)", i, total_count, source_index, target_calendar, sync_mode)
+            
+            syncer = await asyncio.to_thread(_prepare_syncer, base, config, mapping)
+            try:
+                # 执行同步
+                if force_resync:
+                    # 强制重新同步模式：获取源事件并执行强制同步（CalDAV连接已共享）
+                    # 源事件读取和解析不访问iCloud，单独放入线程执行，不占用iCloud限流配额，
+                    # 并与iCloud连接检查并行进行
+                    icloud_ok, current_events = await asyncio.gather(
+                        coalesced_connect_icloud(syncer),
+                        asyncio.to_thread(syncer.get_source_events)
+                    )
+                    if not icloud_ok:
+                        logger.error("❌ 映射 %d iCloud连接失败", i)
+                        return False
+                    
+                    if not current_events:
+                        logger.warning("⚠️  映射 %d 没有找到需要同步的事件", i)
+                        return True  # 没有事件也算成功
+                    
+                    # 执行强制重新同步：会清空并重建目标日历，失败时不重试，留给下一轮
+                    sync_success = await limited(syncer.force_resync, current_events)
+                else:
+                    # 增量同步模式：先通过合并的连接请求建立iCloud连接，sync_calendars中复用；
+                    # 验证失败时sync_calendars内部会执行强制重新同步，因此整体只执行一次
+                    if not await coalesced_connect_icloud(syncer):
+                        logger.error("❌ 映射 %d iCloud连接失败", i)
+                        return False
+                    sync_success = await limited(syncer.sync_calendars, (), True)
+                
+                if sync_success:
+                    logger.info("✅ 映射 %d 同步成功", i)
+                    return True
+                logger.error("❌ 映射 %d 同步失败", i)
+                return False
+            finally:
+                # 派生的同步器各自持有解析进程池（批量模式通常不会创建），映射结束时关闭
+                await asyncio.to_thread(syncer.shutdown_parse_pool)
+        
+        async def run_one(i: int, mapping: BatchMapping) -> MappingResult:
+            start = time.monotonic()
+            try:
+                ok = await sync_one(i, mapping)
+                error = None if ok else "同步失败"
+            except Exception as e:
+                logger.error("❌ 映射 %d 执行异常：%s", i, e)
+                ok, error = False, str(e)
+            return MappingResult(index=i, mapping=mapping, ok=ok, error=error, elapsed=time.monotonic() - start)
+        
+        tasks = [asyncio.ensure_future(run_one(i, mapping)) for i, mapping in enumerate(mappings, 1)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # 调用方提前停止迭代时取消尚未完成的映射
+            for task in tasks:
+                task.cancel()
+    finally:
+        # 基础同步器只用于共享CalDAV连接，通常不会创建解析进程池；守护进程每轮都会重新构造，因此在此关闭
+        base.shutdown_parse_pool()
+
+
+async def _run_batch_async(config: Dict, mappings: List[BatchMapping], force_resync: bool) -> int:
+    """消费映射结果，记录每个映射的耗时指标并统计成功数量"""
+    logger = logging.getLogger(__name__)
+    success_count = 0
+    timings = []
+    async for result in iter_batch_results(config, mappings, force_resync):
+        if result.ok:
+            success_count += 1
+        elapsed_ms = int(result.elapsed * 1000)
+        timings.append((elapsed_ms, result.mapping.target))
+        logger.info(
+            "⏱️  映射 %d 完成：耗时 %d ms，结果 %s",
+            result.index, elapsed_ms, "成功" if result.ok else "失败",
+            extra={"idx": result.index, "ms": elapsed_ms, "ok": result.ok, "target": result.mapping.target}
+        )
+    
+    if timings:
+        durations = [ms for ms, _ in timings]
+        if len(durations) >= 2:
+            cuts = statistics.quantiles(durations, n=20, method="inclusive")
+            p50_ms, p95_ms = int(cuts[9]), int(cuts[18])
+        else:
+            p50_ms = p95_ms = durations[0]
+        tail_ms, tail_target = max(timings)
+        logger.info(
+            "⏱️  批量耗时统计：p50 %d ms，p95 %d ms，最慢映射「%s」%d ms",
+            p50_ms, p95_ms, tail_target, tail_ms,
+            extra={"p50_ms": p50_ms, "p95_ms": p95_ms, "tail_target": tail_target, "tail_ms": tail_ms}
+        )
+    return success_count
+
+
 def run_eventkit_batch(config: Dict, force_resync: bool = False) -> bool:
     """
     检查配置并执行EventKit批量同步模式
@@ -33,100 +436,36 @@ def run_eventkit_batch(config: Dict, force_resync: bool = False) -> bool:
     logger.info("🚀 启用EventKit批量编排模式")
     if force_resync:
         logger.info("⚠️  强制重新同步模式：将清空目标iCloud日历并重新创建所有事件")
-    logger.info(f"📋 批量映射配置：{len(eventkit_batch_map)} 个映射")
+    logger.info("📋 批量映射配置：%d 个映射", len(eventkit_batch_map))
+    
+    # 预处理：校验并去重映射
+    mappings = _validate_mappings(eventkit_batch_map)
     
     # 显示所有映射信息
-    for i, mapping in enumerate(eventkit_batch_map, 1):
-        source_index = mapping.get("source_index")
-        target_calendar = mapping.get("target_icloud_calendar_name")
-        logger.info(f"  映射 {i}: EventKit索引 {source_index} → iCloud日历「{target_calendar}」")
+    for i, m in enumerate(mappings, 1):
+        logger.info("  映射 %d: EventKit索引 %s → iCloud日历「%s」", i, m.source_index, m.target)
     
-    # 批量执行同步
-    success_count = 0
+    # 无效和重复的配置项已在校验时跳过，计入失败，总数以配置中的映射数为准
     total_count = len(eventkit_batch_map)
+    skipped_count = total_count - len(mappings)
+    if not mappings:
+        logger.error("❌ 批量映射配置中没有有效的映射（共 %d 项均无效或重复），未执行任何同步", total_count)
+        logger.info("=" * 60)
+        return True
     
-    for i, mapping in enumerate(eventkit_batch_map, 1):
-        source_index = mapping.get("source_index")
-        target_calendar = mapping.get("target_icloud_calendar_name")
-        
-        if not source_index or not target_calendar:
-            logger.error(f"映射 {i} 配置无效：缺少source_index或target_icloud_calendar_name")
-            continue
-        
-        logger.info("-" * 40)
-        sync_mode = "强制重新同步" if force_resync else "增量同步"
-        logger.info(f"🔄 执行映射 {i}/{total_count}: EventKit索引 {source_index} → iCloud日历「{target_calendar}」({sync_mode})")
-        
-        try:
-            # 创建配置副本
-            batch_config = copy.deepcopy(config)
-            
-            # 覆盖配置：单源单目标模式
-            batch_config["source_routing"] = {
-                "eventkit_indices": [source_index],  # 只使用当前映射的单个索引
-                "caldav_indices": [],               # 强制忽略CalDAV
-                "eventkit_calendars": [],           # 清空EventKit日历名称
-                "fallback_on_404": False            # 禁用CalDAV回退
-            }
-            batch_config["icloud"]["calendar_name"] = target_calendar  # 设置目标iCloud日历
-            
-            # 创建同步器实例（使用原始配置文件路径）
-            original_config_file = config.get("_config_file", "config.json")
-            syncer = CalSync(config_file=original_config_file, caldav_indices=[], eventkit_calendars=[], eventkit_indices=[source_index])
-            # 覆盖配置为批量模式配置
-            syncer.config = batch_config
-            syncer.source_routing = batch_config["source_routing"]
-            
-            # 为每个映射创建独立的同步状态文件，避免状态冲突
-            syncer.sync_state_file = f"logs/sync_state_batch_{source_index}_{target_calendar.replace(' ', '_')}.json"
-            syncer.sync_state = syncer.load_sync_state()
-            
-            # 执行同步
-            if force_resync:
-                # 强制重新同步模式：获取源事件并执行强制同步
-                if not syncer.connect_caldav():
-                    logger.error(f"❌ 映射 {i} CalDAV连接失败")
-                    continue
-                if not syncer.connect_icloud():
-                    logger.error(f"❌ 映射 {i} iCloud连接失败")
-                    continue
-                
-                # 获取源事件
-                current_events = syncer.get_source_events()
-                if not current_events:
-                    logger.warning(f"⚠️  映射 {i} 没有找到需要同步的事件")
-                    success_count += 1  # 没有事件也算成功
-                    continue
-                
-                # 执行强制重新同步
-                sync_success = syncer.force_resync(current_events)
-            else:
-                # 增量同步模式
-                sync_success = syncer.sync_calendars()
-            
-            if sync_success:
-                logger.info(f"✅ 映射 {i} 同步成功")
-                success_count += 1
-            else:
-                logger.error(f"❌ 映射 {i} 同步失败")
-            
-        except Exception as e:
-            logger.error(f"❌ 映射 {i} 执行异常：{e}")
-        
-        # 错峰暂停（除了最后一个映射）
-        if i < total_count:
-            pause_seconds = 8  # 默认8秒暂停
-            logger.info(f"⏸️  暂停 {pause_seconds} 秒以避免iCloud限流...")
-            time.sleep(pause_seconds)
+    # 并发执行所有映射
+    success_count = asyncio.run(_run_batch_async(config, mappings, force_resync))
     
     # 批量执行完成
     logger.info("-" * 40)
-    logger.info(f"🏁 EventKit批量编排完成：{success_count}/{total_count} 个映射成功")
+    logger.info("🏁 EventKit批量编排完成：%d/%d 个映射成功", success_count, total_count)
+    if skipped_count:
+        logger.warning("⚠️  %d 个映射配置无效或重复，已跳过并计为失败", skipped_count)
     
     if success_count == total_count:
         logger.info("✅ 所有映射同步成功")
     elif success_count > 0:
-        logger.warning(f"⚠️  部分映射同步失败：{total_count - success_count} 个失败")
+        logger.warning("⚠️  部分映射同步失败：%d 个失败", total_count - success_count)
     else:
         logger.error("❌ 所有映射同步失败")
     
@@ -134,6 +473,27 @@ def run_eventkit_batch(config: Dict, force_resync: bool = False) -> bool:
     return True  # 表示已处理批量模式
 
 
+def iter_batch_summary(config: Dict) -> Iterator[Dict]:
+    """
+    逐个生成批量映射的摘要信息，供只需遍历或计数的调用方流式使用
+    
+    Args:
+        config: 配置字典
+        
+    Yields:
+        Dict: 单个映射的摘要（source_index, target_calendar）
+    """
+    eventkit_batch_map = config.get("eventkit_batch_map", [])
+    if not eventkit_batch_map or not isinstance(eventkit_batch_map, list):
+        return
+    
+    for mapping in eventkit_batch_map:
+        yield {
+            "source_index": mapping.get("source_index"),
+            "target_calendar": mapping.get("target_icloud_calendar_name")
+        }
+
+
 def get_batch_summary(config: Dict) -> Optional[Dict]:
     """
     获取批量配置摘要信息
@@ -148,16 +508,8 @@ def get_batch_summary(config: Dict) -> Optional[Dict]:
     if not eventkit_batch_map or not isinstance(eventkit_batch_map, list):
         return None
     
-    summary = {
+    return {
         "mode": "batch",
         "total_mappings": len(eventkit_batch_map),
-        "mappings": []
+        "mappings": list(iter_batch_summary(config))
     }
-    
-    for mapping in eventkit_batch_map:
-        summary["mappings"].append({
-            "source_index": mapping.get("source_index"),
-            "target_calendar": mapping.get("target_icloud_calendar_name")
-        })
-    
-    return summary
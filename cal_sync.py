@@ -6,26 +6,45 @@ CalDAV到iCloud日历同步脚本
 """
 
 import os
+import re
 import sys
+import mmap
+import multiprocessing
 import time
 import logging
+import threading
 import argparse
-import schedule
+import atexit
+import signal
+import select
 from datetime import datetime, timedelta, timezone, date
 from typing import List, Dict, Optional, Tuple
 import json
 import hashlib
 import glob
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import islice
+from collections import Counter
 
 try:
     import caldav
     from caldav import Calendar
     from caldav.elements import dav
+    from caldav.elements.base import ValuedBaseElement
     from caldav.lib import error
 except ImportError:
     print("错误：需要安装caldav库。请运行：pip install caldav")
     sys.exit(1)
 
+
+class _GetCTag(ValuedBaseElement):
+    """CalendarServer扩展属性getctag：日历内容的任何变化都会改变该值"""
+    tag = "{http://calendarserver.org/ns/}getctag"
+
 try:
     from icalendar import Calendar as ICal, Event, vCalAddress, vText
     from icalendar.prop import vDDDTypes
@@ -40,6 +59,21 @@ except ImportError:
     print("错误：需要安装keyring库。请运行：pip install keyring")
     sys.exit(1)
 
+try:
+    import orjson
+except ImportError:
+    # orjson为可选依赖，未安装时使用标准库json
+    orjson = None
+
+try:
+    from blake3 import blake3
+except ImportError:
+    # blake3为可选依赖，仅在配置hash_algo为blake3-128时使用
+    blake3 = None
+
+# 分钟数标准化查找表与iCloud写入共用同一份定义（icloud_integration只依赖标准库，始终可以导入）
+from icloud_integration import _NORMALIZED_MINUTES
+
 try:
     from icloud_integration import ICloudIntegration
 except ImportError:
@@ -48,16 +82,104 @@ except ImportError:
 
 try:
     from mac_eventkit_bridge import read_events_from_eventkit, read_events_from_eventkit_by_indices
+    from mac_eventkit_bridge import set_event_hash_algo as _set_eventkit_hash_algo
 except ImportError:
     print("警告：无法导入EventKit桥接模块，EventKit功能将不可用")
     read_events_from_eventkit = None
     read_events_from_eventkit_by_indices = None
+    _set_eventkit_hash_algo = None
+
+
+def _json_loads(data: bytes):
+    """解析JSON（优先使用orjson）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode('utf-8'))
+
+
+# 超过该大小的JSON文件通过mmap交给orjson直接解析，省去读入bytes的整份拷贝
+_MMAP_JSON_THRESHOLD = 1024 * 1024
+
+
+def _read_json_file(path: str):
+    """读取并解析JSON文件；大文件且orjson可用时走mmap"""
+    with open(path, 'rb') as f:
+        if orjson is not None and os.fstat(f.fileno()).st_size >= _MMAP_JSON_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    return orjson.loads(view)
+        return _json_loads(f.read())
+
+
+def _json_dumps(obj) -> bytes:
+    """序列化为带缩进的UTF-8 JSON（优先使用orjson）"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    # 与orjson保持一致：date/datetime按ISO格式序列化，其他无法序列化的类型同样抛出TypeError
+    return json.dumps(obj, indent=2, ensure_ascii=False, default=_json_default).encode('utf-8')
+
+
+def _json_default(obj):
+    if isinstance(obj, date):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _atomic_write_bytes(path: str, data: bytes):
+    """原子写入文件：先写入临时文件并fsync，再替换目标文件，避免写入中途崩溃损坏原文件"""
+    # 临时文件名唯一，避免定时同步与手动同步等多个进程同时写同一状态文件时互相覆盖临时文件
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        # 写入失败时清理临时文件，原文件保持不变
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# iCloud事件描述中的同步标记 [SYNC_UID:key]
+_SYNC_UID_RE = re.compile(r'\[SYNC_UID:([^\]]+)\]')
+# 导出/备份时移除同步标记（连同前面的空白）
+_SYNC_UID_STRIP_RE = re.compile(r'\s*\[SYNC_UID:[^\]]+\]')
+# 描述中的每周循环周期信息，例如："重复周期：2025/09/26-2029/07/20 10:30-11:30, 每周 (周五)"
+_WEEKLY_REPEAT_RE = re.compile(r'重复周期：.*?每周\s*\(([^)]+)\)')
+
+# 事件哈希算法标识，写入同步状态以便检测算法变更（由set_event_hash_algo按配置切换）
+EVENT_HASH_ALGO = "blake2b-128"
+
+# 同步状态文件格式版本，写入时标记；带有当前版本号的状态文件无需再做旧格式检测
+SYNC_STATE_SCHEMA_VERSION = 2
+
+# iCloud日历可访问性检查结果的有效期（秒），有效期内重复连接不再执行AppleScript检查
+_ICLOUD_ACCESS_CHECK_TTL = 600
+
+# 标记iCloud现有事件尚未预先读取（None本身表示日历不可访问）
+_NOT_FETCHED = object()
+
+# DTSTAMP每次响应可能重新生成且不参与变化检测，计算解析缓存键时剔除
+_DTSTAMP_LINE_RE = re.compile(rb'^DTSTAMP[;:][^\r\n]*\r?\n', re.M)
+
+
+def _raw_ical_key(ical_data) -> str:
+    """计算CalDAV对象原始iCal数据的缓存键（忽略DTSTAMP）"""
+    if isinstance(ical_data, str):
+        ical_data = ical_data.encode('utf-8')
+    return hashlib.blake2b(_DTSTAMP_LINE_RE.sub(b'', ical_data), digest_size=16).hexdigest()
 
 
 def _norm_text(s: Optional[str]) -> str:
     """标准化文本字段：去除多余空白、换行等"""
-    s = (s or '').strip()
-    # 折叠所有空白为单空格
+    if not s:
+        return ''
+    # 折叠所有空白为单空格（str.split()与正则\s覆盖相同的Unicode空白字符，
+    # 但split/join在C层一次完成，实测比re.sub(r'\s+', ' ', s)快2~10倍，因此不改用正则）
     return ' '.join(s.split())
 
 
@@ -66,107 +188,69 @@ def _normalize_minutes_global(dt: datetime) -> datetime:
     if dt is None:
         return dt
     
-    # 获取当前分钟数
-    current_minute = dt.minute
-    
-    # 将分钟数标准化为个位数为0或5
-    # 例如：09:29 -> 09:30, 09:44 -> 09:45, 09:59 -> 10:00
-    minute_ones_digit = current_minute % 10
-    
-    if minute_ones_digit <= 2:
-        # 0,1,2 -> 0 (向前调整)
-        normalized_minute = (current_minute // 10) * 10
-    elif minute_ones_digit <= 7:
-        # 3,4,5,6,7 -> 5 (调整到5)
-        normalized_minute = (current_minute // 10) * 10 + 5
-    else:
-        # 8,9 -> 下一个0 (进位到下一个整点)
-        normalized_minute = ((current_minute // 10) + 1) * 10
-        # 如果分钟数超过59，需要进位到下一小时
-        if normalized_minute >= 60:
-            # 使用timedelta进行安全的进位，避免小时数超过23
-            dt = dt.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
-            return dt
+    # 查表得到标准化后的分钟数，例如：09:29 -> 09:30, 09:44 -> 09:45, 09:59 -> 10:00
+    normalized_minute = _NORMALIZED_MINUTES[dt.minute]
+    if normalized_minute >= 60:
+        # 进位到下一小时：使用timedelta进行安全的进位，避免小时数超过23
+        return dt.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
     
     # 返回标准化后的时间
     return dt.replace(minute=normalized_minute, second=0, microsecond=0)
 
 
-def _is_allday_event(event: Dict) -> bool:
-    """判断是否为全天事件"""
+def _to_local_naive(dt: datetime) -> datetime:
+    """将带时区的datetime转换为本地时区的naive时间（等价于 dt.astimezone().replace(tzinfo=None)）"""
+    if dt.tzinfo is None:
+        return dt
+    if dt.microsecond == 0:
+        # 整秒时间戳可被浮点数精确表示；fromtimestamp直接得到本地naive时间，
+        # 省去astimezone()为每次调用构造本地时区对象的开销（约快3倍）
+        return datetime.fromtimestamp(dt.timestamp())
+    return dt.astimezone().replace(tzinfo=None)
+
+
+def _classify_allday(event: Dict) -> Tuple[bool, float]:
+    """
+    一次性判断是否为全天事件并计算其持续时间（小时）
+    
+    开始/结束时间只做一次类型判断和本地时间转换；非全天事件不需要持续时间，返回0.0
+    """
     start = event.get("start")
     end = event.get("end")
     
     # 如果开始时间是date类型（只有日期没有时间），则为全天事件
     if isinstance(start, date) and not isinstance(start, datetime):
-        return True
+        if isinstance(end, datetime):
+            # 开始是date，结束是datetime
+            end_date = _to_local_naive(end).date()
+            return True, ((end_date - start).days + 1) * 24.0
+        if isinstance(end, date):
+            # 两个都是date类型，+1因为包含结束日期
+            return True, ((end - start).days + 1) * 24.0
+        return True, 0.0
     
     # 如果开始和结束时间都是datetime类型，检查是否跨整天
     if isinstance(start, datetime) and isinstance(end, datetime):
         # 转换为本地时间进行比较
-        if start.tzinfo is not None:
-            start = start.astimezone().replace(tzinfo=None)
-        if end.tzinfo is not None:
-            end = end.astimezone().replace(tzinfo=None)
+        start = _to_local_naive(start)
+        end = _to_local_naive(end)
         
         # 检查是否开始于00:00:00，结束于23:59:59或次日00:00:00
         if (start.hour == 0 and start.minute == 0 and start.second == 0 and
             ((end.hour == 23 and end.minute == 59 and end.second >= 59) or
              (end.hour == 0 and end.minute == 0 and end.second == 0 and end.date() > start.date()))):
-            return True
-    
-    return False
-
-
-def _get_event_duration_hours(event: Dict) -> float:
-    """获取事件持续时间（小时）"""
-    start = event.get("start")
-    end = event.get("end")
+            return True, (end - start).total_seconds() / 3600.0  # 转换为小时
     
-    if not start or not end:
-        return 0.0
-    
-    # 处理全天事件
-    if isinstance(start, date) and not isinstance(start, datetime):
-        if isinstance(end, date) and not isinstance(end, datetime):
-            # 两个都是date类型
-            duration_days = (end - start).days + 1  # +1因为包含结束日期
-            return duration_days * 24.0
-        elif isinstance(end, datetime):
-            # 开始是date，结束是datetime
-            end_date = end.date() if end.tzinfo is None else end.astimezone().date()
-            duration_days = (end_date - start).days + 1
-            return duration_days * 24.0
-    elif isinstance(start, datetime):
-        # 开始是datetime类型
-        if isinstance(end, datetime):
-            # 两个都是datetime类型
-            if start.tzinfo is not None:
-                start = start.astimezone().replace(tzinfo=None)
-            if end.tzinfo is not None:
-                end = end.astimezone().replace(tzinfo=None)
-            
-            duration = end - start
-            return duration.total_seconds() / 3600.0  # 转换为小时
-        elif isinstance(end, date):
-            # 开始是datetime，结束是date
-            start_date = start.date() if start.tzinfo is None else start.astimezone().date()
-            duration_days = (end - start_date).days + 1
-            return duration_days * 24.0
-    
-    return 0.0
+    return False, 0.0
 
 
 def _should_ignore_allday_event(event: Dict, max_hours: int) -> bool:
     """判断是否应该忽略全天事件"""
-    if not _is_allday_event(event):
-        return False
-    
-    duration_hours = _get_event_duration_hours(event)
+    is_allday, duration_hours = _classify_allday(event)
     
     # 如果持续时间严格大于指定小时数，则忽略
     # 例如：阈值24小时，只有超过24小时的事件才被忽略
-    return duration_hours > max_hours
+    return is_allday and duration_hours > max_hours
 
 
 def _to_utc_iso(dt) -> str:
@@ -174,6 +258,31 @@ def _to_utc_iso(dt) -> str:
     if dt is None:
         return ""
     
+    try:
+        # 键中带上类型，避免date与datetime相等比较带来的歧义
+        return _to_utc_iso_cached(dt, type(dt))
+    except TypeError:
+        # 不可哈希的输入不走缓存
+        return _to_utc_iso_uncached(dt)
+
+
+@lru_cache(maxsize=8192)
+def _to_utc_iso_cached(dt, _dt_type) -> str:
+    """_to_utc_iso的缓存层：重复事件展开后大量共享相同的开始/结束时间"""
+    return _to_utc_iso_uncached(dt)
+
+
+def _to_utc_iso_uncached(dt) -> str:
+    # 精确类型为datetime的输入（绝大多数）跳过isinstance判断；已是UTC的时间无需astimezone转换
+    if dt.__class__ is datetime:
+        tzinfo = dt.tzinfo
+        if tzinfo is timezone.utc:
+            return dt.isoformat()
+        if tzinfo is None:
+            # 假设为本地时区（实际应用中可能需要更智能的时区检测）
+            return dt.replace(tzinfo=timezone.utc).isoformat()
+        return dt.astimezone(timezone.utc).isoformat()
+    
     # 如果是date类型（全天事件）
     if isinstance(dt, date) and not isinstance(dt, datetime):
         return f"{dt.isoformat()}|ALLDAY"
@@ -195,32 +304,308 @@ def _norm_rrule(rrule) -> str:
         return ""
     
     try:
-        raw = rrule.to_ical().decode('utf-8', errors='ignore')
-        # 按分号分割并排序，避免顺序差异
-        parts = [p.strip() for p in raw.split(';') if p.strip()]
-        parts.sort()
-        return ';'.join(parts)
+        return _norm_rrule_ical(rrule.to_ical())
     except Exception:
         return str(rrule)
 
 
+@lru_cache(maxsize=1024)
+def _norm_rrule_ical(raw: bytes) -> str:
+    """_norm_rrule的缓存层：同一重复系列展开的实例及相似的重复事件大量共享相同的RRULE"""
+    # 按分号分割并排序，避免顺序差异
+    return ';'.join(sorted(p for p in (x.strip() for x in raw.decode('utf-8', errors='ignore').split(';')) if p))
+
+
 def _norm_exdate(exdate) -> str:
     """标准化EXDATE字段：提取为ISO列表并排序"""
     if not exdate:
         return ""
     
-    vals = []
     try:
         # icalendar的exdate.dts是一个列表
-        for d in exdate.dts:
-            dt = getattr(d, 'dt', d)
-            vals.append(_to_utc_iso(dt))
+        return ','.join(sorted(_to_utc_iso(getattr(d, 'dt', d)) for d in exdate.dts))
     except Exception:
         # 兼容奇怪的实现
-        vals.append(str(exdate))
-    
-    vals.sort()
-    return ','.join(vals)
+        return str(exdate)
+
+
+def _parse_vevent(event) -> Optional[Dict]:
+    """解析iCal VEVENT组件为事件字典（模块级函数，可在子进程中执行）"""
+    try:
+        # 获取基本字段
+        uid = event.get("UID")
+        if not uid:
+            logging.getLogger(__name__).warning("事件缺少UID，跳过")
+            return None
+        uid = str(uid)
+
+        # 获取循环相关字段
+        recurrence_id = event.get("RECURRENCE-ID")
+        rrule = event.get("RRULE")
+        exdate = event.get("EXDATE")
+
+        # 创建稳定主键：UID + RECURRENCE-ID（如果有）
+        if recurrence_id:
+            # 保留完整的RECURRENCE-ID ISO格式
+            rec_id_dt = recurrence_id.dt if hasattr(recurrence_id, 'dt') else recurrence_id
+            if hasattr(rec_id_dt, 'isoformat'):
+                rec_id_str = rec_id_dt.isoformat()
+            else:
+                rec_id_str = str(rec_id_dt)
+            stable_key = f"{uid}#{rec_id_str}"
+            is_recurring_instance = True
+        else:
+            stable_key = uid
+            is_recurring_instance = False
+
+        # 标准化字段
+        rrule_norm = _norm_rrule(rrule)
+        exdate_norm = _norm_exdate(exdate)
+
+        # 在描述中添加同步标记以便在iCloud中识别
+        description = _norm_text(event.get("DESCRIPTION", ""))
+        if description:
+            sync_marker = f" [SYNC_UID:{stable_key}]"
+            if sync_marker not in description:
+                description += sync_marker
+        else:
+            description = f"[SYNC_UID:{stable_key}]"
+
+        # 获取并标准化时间字段
+        start_dt = event.get("DTSTART").dt if event.get("DTSTART") else None
+        end_dt = event.get("DTEND").dt if event.get("DTEND") else None
+
+        # 对开始和结束时间进行标准化
+        if isinstance(start_dt, datetime):
+            # 转换为本地时间（去掉时区信息）
+            start_dt = _normalize_minutes_global(_to_local_naive(start_dt))
+
+        if isinstance(end_dt, datetime):
+            # 转换为本地时间（去掉时区信息）
+            end_dt = _normalize_minutes_global(_to_local_naive(end_dt))
+
+        event_dict = {
+            "uid": uid,
+            "stable_key": stable_key,  # 稳定主键
+            "summary": _norm_text(event.get("SUMMARY", "")),
+            "description": description,  # 包含同步标记
+            "location": _norm_text(event.get("LOCATION", "")),
+            "start": start_dt,
+            "end": end_dt,
+            "created": event.get("CREATED").dt if event.get("CREATED") else None,
+            "last_modified": event.get("LAST-MODIFIED").dt if event.get("LAST-MODIFIED") else None,
+            "recurrence_id": rec_id_str if recurrence_id else None,
+            "rrule": rrule_norm,
+            "exdate": exdate_norm,
+            "is_recurring_instance": is_recurring_instance
+        }
+
+        # 生成事件哈希用于比较
+        event_dict["hash"] = _generate_event_hash(event_dict)
+
+        return event_dict
+
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"解析iCal事件失败：{e}")
+        return None
+
+def _hash_payload(hash_fields: List[str]) -> bytes:
+    """拼接为单个缓冲区整体喂给哈希对象：一次update比逐字段多次update调用开销更小；
+    使用双分隔符避免字段边界问题"""
+    return '||'.join(hash_fields).encode('utf-8')
+
+
+def _blake2b_fields_hash(hash_fields: List[str]) -> str:
+    return hashlib.blake2b(_hash_payload(hash_fields), digest_size=16).hexdigest()
+
+
+def _blake3_fields_hash(hash_fields: List[str]) -> str:
+    return blake3(_hash_payload(hash_fields)).hexdigest(length=16)
+
+
+def _md5_fields_hash(hash_fields: List[str]) -> str:
+    return hashlib.md5(_hash_payload(hash_fields)).hexdigest()
+
+
+# 哈希算法标识 -> 对语义字段计算十六进制摘要的函数（md5仅用于迁移旧同步状态）
+_EVENT_HASH_FUNCS = {
+    "md5": _md5_fields_hash,
+    "blake2b-128": _blake2b_fields_hash,
+}
+if blake3 is not None:
+    _EVENT_HASH_FUNCS["blake3-128"] = _blake3_fields_hash
+
+_event_hash_func = _blake2b_fields_hash
+
+
+def set_event_hash_algo(algo: str) -> str:
+    """
+    切换事件哈希算法（进程级设置，进程池子进程通过initializer同步）
+    
+    Returns:
+        实际生效的算法标识；未知算法或依赖未安装时保持blake2b-128
+    """
+    global EVENT_HASH_ALGO, _event_hash_func
+    if algo == "md5" or algo not in _EVENT_HASH_FUNCS:
+        if algo != "blake2b-128":
+            logging.getLogger(__name__).warning(f"事件哈希算法 {algo} 不可用（blake3-128需要安装blake3库），使用 blake2b-128")
+        algo = "blake2b-128"
+    EVENT_HASH_ALGO = algo
+    _event_hash_func = _EVENT_HASH_FUNCS[algo]
+    if _set_eventkit_hash_algo is not None:
+        _set_eventkit_hash_algo(algo)
+    return algo
+
+
+def _generate_event_hash(event: Dict) -> str:
+    """生成事件哈希值用于比较（仅用于变化检测，非加密用途，默认使用比MD5更快的BLAKE2b）"""
+    return _event_hash_func(_event_hash_fields(event))
+
+@dataclass
+class EventColumns:
+    """
+    事件集合的列式视图：只保留同步状态和比较所需的字段
+    
+    事件字典仍是各模块之间传递事件的格式（创建iCloud事件、备份等需要完整字段），
+    只需要这几个字段的批量处理先投影成列，再按列遍历或zip。
+    """
+    stable_keys: List[str] = field(default_factory=list)
+    uids: List[str] = field(default_factory=list)
+    summaries: List[str] = field(default_factory=list)
+    hashes: List[str] = field(default_factory=list)
+    
+    @classmethod
+    def from_events(cls, events: List[Dict]) -> "EventColumns":
+        """从事件字典列表一次性投影出各列"""
+        columns = cls()
+        for event in events:
+            columns.stable_keys.append(event["stable_key"])
+            columns.uids.append(event["uid"])
+            columns.summaries.append(event["summary"])
+            columns.hashes.append(event["hash"])
+        return columns
+    
+    def __len__(self) -> int:
+        return len(self.stable_keys)
+
+
+@dataclass
+class VerifyResult:
+    """同步验证结果；布尔值即是否通过，并携带已去重的CalDAV侧集合供重新同步后的验证复用"""
+    ok: bool
+    caldav_keys: set = field(default_factory=set)
+    caldav_summaries: set = field(default_factory=set)
+    
+    def __bool__(self) -> bool:
+        return self.ok
+
+
+def _aggregate_event_digest(columns: EventColumns) -> str:
+    """计算整组事件的摘要：按主键排序后汇总(主键, 事件哈希)，任一事件增删改都会改变结果"""
+    h = hashlib.blake2b(digest_size=16)
+    for stable_key, event_hash in sorted(zip(columns.stable_keys, columns.hashes)):
+        h.update(stable_key.encode('utf-8'))
+        h.update(b'|')
+        h.update(event_hash.encode('utf-8'))
+        h.update(b'\n')
+    return h.hexdigest()
+
+
+def _event_hash_fields(event: Dict) -> List[str]:
+    """收集参与哈希的语义字段"""
+    # 只使用稳定的语义字段，移除元数据字段避免误报修改
+    hash_fields = [
+        event.get('stable_key', event.get('uid', '')),  # 稳定主键
+        event.get('summary') or '',  # 解析时已标准化
+        event.get('description') or '',  # 解析时已标准化（含同步标记）
+        event.get('location') or '',  # 解析时已标准化
+        event.get('rrule', '') or '',  # 已标准化
+        event.get('exdate', '') or '',  # 已标准化
+    ]
+
+    # 统一转换为UTC ISO格式的时间
+    hash_fields.append(_to_utc_iso(event.get('start')))
+    hash_fields.append(_to_utc_iso(event.get('end')))
+
+    # 包含RECURRENCE-ID（如果有）
+    if event.get('recurrence_id'):
+        hash_fields.append(event.get('recurrence_id'))
+
+    return hash_fields
+
+def _event_hash_string(event: Dict) -> str:
+    """拼接参与哈希的语义字段"""
+    return '||'.join(_event_hash_fields(event))  # 使用双分隔符避免字段边界问题
+
+
+def _parse_ical_data(ical_data) -> List[Dict]:
+    """解析一个CalDAV对象的iCal数据中的所有VEVENT（模块级函数，供进程池调用）"""
+    try:
+        cal = ICal.from_ical(ical_data)
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"解析事件失败：{e}")
+        return []
+    
+    events = []
+    # CalDAV对象中的VEVENT是VCALENDAR的直接子组件，无需递归遍历（walk会深入VALARM等嵌套组件）
+    for component in cal.subcomponents:
+        if component.name != 'VEVENT':
+            continue
+        event_dict = _parse_vevent(component)
+        if event_dict:
+            events.append(event_dict)
+    return events
+
+
+# 事件字典中的日期/时间字段，日历快照以ISO字符串保存
+_SNAPSHOT_TIME_FIELDS = ("start", "end", "created", "last_modified")
+
+
+def _time_to_iso(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def _time_from_iso(value):
+    """还原_time_to_iso的结果：datetime.isoformat()总含有'T'，date.isoformat()不含"""
+    if not isinstance(value, str):
+        return value
+    return datetime.fromisoformat(value) if 'T' in value else date.fromisoformat(value)
+
+
+def _encode_calendar_snapshot(snapshot: Dict, parsed: Dict[str, List[Dict]]) -> Dict:
+    """将日历快照及其对应的解析缓存转换为可JSON序列化的结构"""
+    start, end, expand = snapshot["window"]
+    encoded_parsed = {}
+    for key, events in parsed.items():
+        encoded_events = []
+        for event in events:
+            event = dict(event)
+            for name in _SNAPSHOT_TIME_FIELDS:
+                event[name] = _time_to_iso(event.get(name))
+            encoded_events.append(event)
+        encoded_parsed[key] = encoded_events
+    return {
+        "window": [start.isoformat(), end.isoformat(), expand],
+        "markers": snapshot["markers"],
+        "keys": snapshot["keys"],
+        "parsed": encoded_parsed,
+    }
+
+
+def _decode_calendar_snapshot(data: Dict) -> Tuple[Dict, Dict[str, List[Dict]]]:
+    """还原_encode_calendar_snapshot的结果，返回(快照, 解析缓存)"""
+    start, end, expand = data["window"]
+    parsed = data["parsed"]
+    for events in parsed.values():
+        for event in events:
+            for name in _SNAPSHOT_TIME_FIELDS:
+                event[name] = _time_from_iso(event.get(name))
+    snapshot = {
+        "window": (date.fromisoformat(start), date.fromisoformat(end), expand),
+        "markers": data["markers"],
+        "keys": [sys.intern(key) for key in data["keys"]],
+    }
+    return snapshot, parsed
 
 
 class CalSync:
@@ -230,14 +615,44 @@ class CalSync:
         """初始化同步器"""
         self.config_file = config_file
         self.config = self.load_config()
+        self._bind_config()
         self.ensure_logs_folder()
         self.setup_logging()
         self.merge_old_logs()
         self.caldav_client = None
+        # 当前CalDAV客户端对应的(服务器URL, 用户名, 密码)及其principal，配置未变时跨轮次复用
+        self._caldav_client_key = None
+        self._caldav_principal = None
+        # 本次连接查询到的日历列表及 {URL: 日历} 索引，每次connect_caldav时失效以发现服务器端新增/删除的日历
+        self._calendar_list = None
+        self._calendar_url_index: Dict[str, object] = {}
+        # {从1开始的日历索引: 日历}，与命令行/配置中的日历索引一致
+        self._calendars_by_index: Dict[int, object] = {}
+        # 按用户名缓存从keyring读取的CalDAV密码，定时同步时避免每轮访问系统钥匙串
+        self._caldav_password_cache: Dict[str, str] = {}
         self.icloud_client = None
+        # 当前iCloud客户端对应的(日历名, 专用密码)及可访问性检查的有效截止时间（monotonic）
+        self._icloud_client_key = None
+        self._icloud_verified_until = 0.0
         self.sync_state_file = "logs/sync_state.json"
         self.backup_state_file = "logs/backup_state.json"
         self.sync_state = self.load_sync_state()
+        # 同步状态是否有尚未写入磁盘的修改
+        self._state_dirty = False
+        # 上次写入磁盘的同步状态内容摘要，内容未变时跳过写入
+        self._state_digest = None
+        # 串行化状态文件写入（后台写入线程与同步流程结束时的写入可能重叠）
+        self._state_write_lock = threading.Lock()
+        # 按日历URL缓存解析结果：{calendar_url: {原始数据键: 事件列表}}
+        self._parse_cache: Dict[str, Dict[str, List[Dict]]] = {}
+        # 按日历URL记录上次查询的窗口、sync-token和对象键列表（事件本身从_parse_cache还原），
+        # 用于服务器无变化时跳过完整查询
+        self._calendar_snapshots: Dict[str, Dict] = {}
+        # iCal解析进程池：首次需要时创建，跨日历和跨轮次复用，避免每次重新启动并导入子进程
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        self._parse_pool_lock = threading.Lock()
+        # 已加载的快照文件路径；定时任务以--once逐次启动进程时，快照需从磁盘恢复才能跳过未变化的日历
+        self._snapshots_loaded_from = None
         
         # 处理源路由配置
         self.source_routing = self.config.get("source_routing", {})
@@ -260,23 +675,92 @@ class CalSync:
         if "fallback_on_404" not in self.source_routing:
             self.source_routing["fallback_on_404"] = True
     
+    def _derive(self, config: Dict) -> "CalSync":
+        """
+        基于当前同步器派生一个使用指定配置的同步器（批量模式下每个映射一个）
+        
+        只有CalDAV连接（客户端、principal、日历列表及索引、密码缓存）有意与当前同步器共享；
+        解析缓存、快照、进程池、同步状态及其写入锁和iCloud客户端都是派生同步器独立的新对象，
+        避免并发执行的映射之间互相修改。同步状态由调用方在派生后设置。
+        
+        Args:
+            config: 派生同步器使用的配置
+            
+        Returns:
+            CalSync: 派生的同步器
+        """
+        derived = CalSync.__new__(CalSync)
+        derived.config_file = self.config_file
+        derived.logger = self.logger
+        
+        # 解析缓存需在_bind_config之前创建（哈希算法切换时会清空它们）
+        derived._parse_cache = {}
+        derived._calendar_snapshots = {}
+        derived._parse_pool = None
+        derived._parse_pool_lock = threading.Lock()
+        derived._snapshots_loaded_from = None
+        derived.config = config
+        derived._bind_config()
+        
+        # 共享的CalDAV连接
+        derived.caldav_client = self.caldav_client
+        derived._caldav_client_key = self._caldav_client_key
+        derived._caldav_principal = self._caldav_principal
+        derived._calendar_list = self._calendar_list
+        derived._calendar_url_index = self._calendar_url_index
+        derived._calendars_by_index = self._calendars_by_index
+        derived._caldav_password_cache = self._caldav_password_cache
+        
+        # iCloud客户端与目标日历绑定，不共享
+        derived.icloud_client = None
+        derived._icloud_client_key = None
+        derived._icloud_verified_until = 0.0
+        
+        derived.sync_state_file = self.sync_state_file
+        derived.backup_state_file = self.backup_state_file
+        derived.sync_state = {"last_sync": None, "events": {}}
+        derived._state_dirty = False
+        derived._state_digest = None
+        derived._state_write_lock = threading.Lock()
+        
+        derived.source_routing = {**self.source_routing, **config.get("source_routing", {})}
+        return derived
+    
+    def _bind_config(self):
+        """缓存常用的配置子字典和开关，避免热路径上反复解析嵌套字典（替换self.config后需重新调用）"""
+        self.sync_cfg = self.config.setdefault("sync", {})
+        self.caldav_cfg = self.config.setdefault("caldav", {})
+        self.icloud_cfg = self.config.setdefault("icloud", {})
+        self.expand_recurring = self.sync_cfg.get("expand_recurring", True)
+        self.verify_threshold = self.sync_cfg.get("verify_threshold", 0.9)
+        self.override_icloud_deletions = self.sync_cfg.get("override_icloud_deletions", True)
+        previous_algo = EVENT_HASH_ALGO
+        if set_event_hash_algo(self.sync_cfg.get("hash_algo", "blake2b-128")) != previous_algo:
+            # 已缓存的解析结果携带旧算法的哈希，算法切换后全部作废
+            if hasattr(self, "_parse_cache"):
+                self._parse_cache.clear()
+                self._calendar_snapshots.clear()
+                # 子进程在启动时设置哈希算法，算法切换后需要重新创建进程池
+                self.shutdown_parse_pool()
+    
     def ensure_logs_folder(self) -> bool:
         """确保logs文件夹存在"""
+        # 直接创建并处理已存在的情况，省去一次exists检查
         try:
-            if not os.path.exists("logs"):
-                os.makedirs("logs")
-                print("创建logs文件夹")
-            return True
+            os.mkdir("logs")
+            print("创建logs文件夹")
+        except FileExistsError:
+            pass
         except Exception as e:
             print(f"创建logs文件夹失败：{e}")
             return False
+        return True
         
     def load_config(self) -> Dict:
         """加载配置文件"""
-        if os.path.exists(self.config_file):
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        else:
+        try:
+            return _read_json_file(self.config_file)
+        except FileNotFoundError:
             # 创建默认配置文件
             default_config = {
                 "caldav": {
@@ -311,30 +795,97 @@ class CalSync:
             print("请编辑配置文件并填入您的CalDAV和iCloud凭据")
             sys.exit(1)
     
-    def load_sync_state(self) -> Dict:
-        """加载同步状态"""
-        if os.path.exists(self.sync_state_file):
-            with open(self.sync_state_file, 'r', encoding='utf-8') as f:
-                state = json.load(f)
-                
-                # 检查是否需要迁移旧的同步状态格式
-                if "events" in state and state["events"]:
-                    # 检查第一个事件是否使用旧格式（只有hash和last_sync）
-                    first_event_key = next(iter(state["events"]))
-                    first_event = state["events"][first_event_key]
-                    
-                    if isinstance(first_event, dict) and "summary" not in first_event:
-                        self.logger.info("检测到旧格式同步状态，将在下次同步时自动迁移")
-                        # 清空旧状态，让系统重新建立
-                        state["events"] = {}
-                
-                return state
-        return {"last_sync": None, "events": {}}
+    def load_sync_state(self, state_file: str = None) -> Dict:
+        """加载同步状态（默认读取self.sync_state_file）"""
+        state_file = state_file or self.sync_state_file
+        try:
+            state = _read_json_file(state_file)
+        except FileNotFoundError:
+            return {"last_sync": None, "events": {}}
+        
+        # 检查是否需要迁移旧的同步状态格式（未标记版本号的文件才可能是旧格式）
+        if state.get("schema_version") == SYNC_STATE_SCHEMA_VERSION:
+            state["events"] = {sys.intern(key): record for key, record in state.get("events", {}).items()}
+        elif "events" in state and state["events"]:
+            # 检查第一个事件是否使用旧格式（只有hash和last_sync）
+            first_event_key = next(iter(state["events"]))
+            first_event = state["events"][first_event_key]
+            
+            if isinstance(first_event, dict) and "summary" not in first_event:
+                self.logger.info("检测到旧格式同步状态，将在下次同步时自动迁移")
+                # 清空旧状态，让系统重新建立
+                state["events"] = {}
+            else:
+                # 驻留主键，与源事件的主键共享同一字符串对象
+                state["events"] = {sys.intern(key): record for key, record in state["events"].items()}
+        
+        return state
+    
+    def _serialize_sync_state(self) -> Optional[bytes]:
+        """
+        序列化同步状态并标记格式版本
+        
+        Returns:
+            序列化结果；与上次写入的内容完全相同时返回None（被标记为修改但实际内容未变）
+        """
+        self.sync_state["schema_version"] = SYNC_STATE_SCHEMA_VERSION
+        data = _json_dumps(self.sync_state)
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        if digest == self._state_digest:
+            return None
+        self._state_digest = digest
+        return data
     
     def save_sync_state(self):
-        """保存同步状态"""
-        with open(self.sync_state_file, 'w', encoding='utf-8') as f:
-            json.dump(self.sync_state, f, indent=4, ensure_ascii=False)
+        """保存同步状态（原子写入）；没有未保存的修改或内容与上次写入相同时跳过写入"""
+        if not self._state_dirty:
+            return
+        data = self._serialize_sync_state()
+        if data is not None:
+            try:
+                with self._state_write_lock:
+                    _atomic_write_bytes(self.sync_state_file, data)
+            except Exception:
+                self._state_digest = None
+                raise
+        self._state_dirty = False
+    
+    def _save_sync_state_in_background(self) -> Optional[threading.Thread]:
+        """
+        在当前线程序列化同步状态快照，由后台线程完成写入和fsync，使磁盘刷新与后续的网络操作重叠
+        
+        Returns:
+            写入线程（调用方需要join）；没有未保存的修改时返回None
+        """
+        if not self._state_dirty:
+            return None
+        # 先序列化快照：之后主线程继续修改sync_state不会影响本次写入
+        data = self._serialize_sync_state()
+        self._state_dirty = False
+        if data is None:
+            return None
+        state_file = self.sync_state_file
+        
+        def _write():
+            try:
+                with self._state_write_lock:
+                    _atomic_write_bytes(state_file, data)
+            except Exception as e:
+                self.logger.error(f"保存同步状态失败：{e}")
+                # 写入失败时重新标记，由同步流程结束时再次尝试写入
+                self._state_digest = None
+                self._state_dirty = True
+        
+        writer = threading.Thread(target=_write, name="sync-state-writer")
+        writer.start()
+        return writer
+    
+    def _flush_sync_state(self):
+        """在同步流程结束时写入尚未保存的同步状态"""
+        try:
+            self.save_sync_state()
+        except Exception as e:
+            self.logger.error(f"保存同步状态失败：{e}")
     
     def setup_logging(self):
         """设置日志"""
@@ -375,75 +926,143 @@ class CalSync:
             old_error_log = "cal_sync_error.log"
             new_error_log = "logs/cal_sync_error.log"
             
-            if os.path.exists(old_error_log):
-                self.logger.info("正在合并旧的错误日志文件...")
-                with open(old_error_log, 'r', encoding='utf-8') as old_file:
-                    old_content = old_file.read()
-                
-                with open(new_error_log, 'a', encoding='utf-8') as new_file:
-                    new_file.write("\n" + "="*50 + "\n")
-                    new_file.write("以下是旧的错误日志内容：\n")
-                    new_file.write("="*50 + "\n")
-                    new_file.write(old_content)
-                
+            if self._append_log_file(old_error_log, new_error_log, "以下是旧的错误日志内容："):
                 self.logger.info("旧错误日志文件已合并")
             
             # 合并旧的cal_sync.log
             old_log = "logs/cal_sync.log.old"
             new_log = "logs/cal_sync.log"
             
-            if os.path.exists(old_log):
-                self.logger.info("正在合并旧的主日志文件...")
-                with open(old_log, 'r', encoding='utf-8') as old_file:
-                    old_content = old_file.read()
-                
-                with open(new_log, 'a', encoding='utf-8') as new_file:
-                    new_file.write("\n" + "="*50 + "\n")
-                    new_file.write("以下是旧的主日志内容：\n")
-                    new_file.write("="*50 + "\n")
-                    new_file.write(old_content)
-                
+            if self._append_log_file(old_log, new_log, "以下是旧的主日志内容："):
                 self.logger.info("旧主日志文件已合并")
                 
         except Exception as e:
             print(f"合并旧日志文件失败：{e}")
     
+    @staticmethod
+    def _append_log_file(old_path: str, new_path: str, title: str) -> bool:
+        """
+        把旧日志文件追加到新日志文件末尾：以二进制分块复制，不解码也不整体读入内存
+        
+        Returns:
+            旧日志文件不存在时返回False
+        """
+        try:
+            old_file = open(old_path, 'rb')
+        except FileNotFoundError:
+            return False
+        separator = "=" * 50
+        header = f"\n{separator}\n{title}\n{separator}\n".encode('utf-8')
+        with old_file, open(new_path, 'ab') as new_file:
+            new_file.write(header)
+            shutil.copyfileobj(old_file, new_file, 1024 * 1024)
+        return True
+    
     def connect_caldav(self) -> bool:
         """连接CalDAV服务器"""
         try:
             self.logger.info("正在连接CalDAV服务器...")
             
-            # 从keyring获取密码，如果没有则从配置文件获取
-            password = get_password("cal_sync", self.config["caldav"]["username"])
-            if not password:
-                password = self.config["caldav"]["password"]
-                if password:
-                    set_password("cal_sync", self.config["caldav"]["username"], password)
+            # 日历列表每次连接时重新查询
+            self._calendar_list = None
+            self._calendar_url_index = {}
+            self._calendars_by_index = {}
+            
+            username = self.caldav_cfg["username"]
+            password = self._get_caldav_password(username)
             
             # 使用base_url，如果没有则从server构建
-            if "base_url" in self.config["caldav"] and self.config["caldav"]["base_url"]:
-                server_url = self.config["caldav"]["base_url"]
+            if "base_url" in self.caldav_cfg and self.caldav_cfg["base_url"]:
+                server_url = self.caldav_cfg["base_url"]
             else:
                 # 确保URL有协议前缀
-                server_url = self.config["caldav"]["server"]
+                server_url = self.caldav_cfg["server"]
                 if not server_url.startswith(('http://', 'https://')):
                     server_url = f"https://{server_url}"
             
+            client_key = (server_url, username, password)
+            if self.caldav_client is not None and self._caldav_client_key == client_key:
+                # 复用已有客户端的HTTP会话（keep-alive连接池），避免每轮同步重新进行DNS解析和TLS握手
+                try:
+                    self._caldav_principal = self.caldav_client.principal()
+                    self.logger.info("CalDAV连接成功（复用已有会话）")
+                    return True
+                except Exception as e:
+                    self.logger.warning(f"复用CalDAV会话失败，重新建立连接：{e}")
+                    if isinstance(e, error.AuthorizationError):
+                        # 密码可能已在钥匙串中更新，重新读取
+                        self._caldav_password_cache.pop(username, None)
+                        password = self._get_caldav_password(username)
+            
+            self._close_caldav_client()
             self.caldav_client = caldav.DAVClient(
                 url=server_url,
-                username=self.config["caldav"]["username"],
+                username=username,
                 password=password
             )
             
             # 测试连接
-            principal = self.caldav_client.principal()
+            self._caldav_principal = self.caldav_client.principal()
+            self._caldav_client_key = (server_url, username, password)
             self.logger.info("CalDAV连接成功")
             return True
             
         except Exception as e:
+            if isinstance(e, error.AuthorizationError):
+                # 认证失败时丢弃缓存的密码，下次连接重新从keyring读取（支持更换密码）
+                self._caldav_password_cache.clear()
             self.logger.error(f"CalDAV连接失败：{e}")
             return False
     
+    def _get_caldav_password(self, username: str) -> Optional[str]:
+        """获取CalDAV密码：优先使用本进程内的缓存，其次keyring，最后配置文件（并写入keyring）"""
+        password = self._caldav_password_cache.get(username)
+        if password:
+            return password
+        
+        # 从keyring获取密码，如果没有则从配置文件获取；keyring访问涉及与系统钥匙串服务的进程间通信，结果缓存复用
+        password = get_password("cal_sync", username)
+        if not password:
+            password = self.caldav_cfg["password"]
+            if password:
+                set_password("cal_sync", username, password)
+        if password:
+            self._caldav_password_cache[username] = password
+        return password
+    
+    def _close_caldav_client(self):
+        """关闭当前CalDAV客户端及其连接池"""
+        client = self.caldav_client
+        self.caldav_client = None
+        self._caldav_client_key = None
+        self._caldav_principal = None
+        self._calendar_list = None
+        self._calendar_url_index = {}
+        self._calendars_by_index = {}
+        if client is not None and hasattr(client, "close"):
+            try:
+                client.close()
+            except Exception as e:
+                self.logger.debug(f"关闭CalDAV客户端失败：{e}")
+    
+    def _get_calendars(self) -> list:
+        """
+        获取CalDAV日历列表
+        
+        每次connect_caldav后只向服务器查询一次，同一轮同步中的事件获取、EventKit索引映射和回退检查共用该列表
+        """
+        if self._calendar_list is None:
+            self._calendar_list = self._get_caldav_principal().calendars()
+            self._calendar_url_index = {str(cal.url): cal for cal in self._calendar_list}
+            self._calendars_by_index = {i: cal for i, cal in enumerate(self._calendar_list, 1)}
+        return self._calendar_list
+    
+    def _get_caldav_principal(self):
+        """获取CalDAV principal，优先使用连接时缓存的对象以省去一次PROPFIND请求"""
+        if self._caldav_principal is None:
+            self._caldav_principal = self.caldav_client.principal()
+        return self._caldav_principal
+    
     def connect_icloud(self) -> bool:
         """连接iCloud"""
         try:
@@ -451,17 +1070,27 @@ class CalSync:
             
             
             if ICloudIntegration:
-                app_password = self.config["icloud"].get("app_private_password")
+                app_password = self.icloud_cfg.get("app_private_password")
+                client_key = (self.icloud_cfg["calendar_name"], app_password)
+                if (self.icloud_client is not None and self._icloud_client_key == client_key
+                        and time.monotonic() < self._icloud_verified_until):
+                    # 最近已确认日历可访问，复用客户端，跳过AppleScript检查
+                    self.logger.info("iCloud日历可访问性检查仍在有效期内，复用已有连接")
+                    return True
+                
+                self._icloud_verified_until = 0.0
                 self.icloud_client = ICloudIntegration(
-                    self.config["icloud"]["calendar_name"], 
+                    self.icloud_cfg["calendar_name"], 
                     app_password
                 )
+                self._icloud_client_key = client_key
                 self.logger.info("iCloud集成模块加载成功")
                 
                 # 检查日历是否可访问
                 if not self.icloud_client.check_calendar_accessibility():
                     self.logger.error("目标iCloud日历不可访问，请确保启动macOS日历应用并勾选目标日历")
                     return False
+                self._icloud_verified_until = time.monotonic() + _ICLOUD_ACCESS_CHECK_TTL
                 
             else:
                 self.logger.warning("iCloud集成模块不可用")
@@ -473,15 +1102,14 @@ class CalSync:
             self.logger.error(f"iCloud连接失败：{e}")
             return False
     
-    def get_caldav_events(self, selected_calendar_indices: List[int] = None) -> List[Dict]:
+    def get_caldav_events(self, selected_calendar_indices: Tuple[int, ...] = ()) -> List[Dict]:
         """获取CalDAV日历事件"""
         try:
             if not self.caldav_client:
                 return []
             
             # 获取所有日历
-            principal = self.caldav_client.principal()
-            calendars = principal.calendars()
+            calendars = self._get_calendars()
             
             if not calendars:
                 self.logger.warning("未找到CalDAV日历")
@@ -496,28 +1124,34 @@ class CalSync:
             selected_calendars = []
             
             # 如果指定了日历索引列表
+            valid_range = f"1-{len(calendars)}"
             if selected_calendar_indices:
                 for idx in selected_calendar_indices:
-                    if 1 <= idx <= len(calendars):
-                        selected_calendars.append(calendars[idx-1])
-                        self.logger.info(f"选择日历 {idx}: {calendars[idx-1].name}")
+                    cal = self._calendars_by_index.get(idx)
+                    if cal is not None:
+                        selected_calendars.append(cal)
+                        self.logger.info(f"选择日历 {idx}: {cal.name}")
                     else:
-                        self.logger.warning(f"无效的日历索引: {idx} (有效范围: 1-{len(calendars)})")
+                        self.logger.warning(f"无效的日历索引: {idx} (有效范围: {valid_range})")
             # 如果配置文件中指定了日历索引
-            elif self.config["caldav"].get("selected_calendars"):
-                for idx in self.config["caldav"]["selected_calendars"]:
-                    if 1 <= idx <= len(calendars):
-                        selected_calendars.append(calendars[idx-1])
-                        self.logger.info(f"从配置选择日历 {idx}: {calendars[idx-1].name}")
+            elif self.caldav_cfg.get("selected_calendars"):
+                for idx in self.caldav_cfg["selected_calendars"]:
+                    cal = self._calendars_by_index.get(idx)
+                    if cal is not None:
+                        selected_calendars.append(cal)
+                        self.logger.info(f"从配置选择日历 {idx}: {cal.name}")
                     else:
-                        self.logger.warning(f"配置中的无效日历索引: {idx} (有效范围: 1-{len(calendars)})")
+                        self.logger.warning(f"配置中的无效日历索引: {idx} (有效范围: {valid_range})")
             # 如果指定了特定日历URL
-            elif self.config["caldav"].get("calendar_url"):
-                for cal in calendars:
-                    if cal.url == self.config["caldav"]["calendar_url"]:
-                        selected_calendars.append(cal)
-                        self.logger.info(f"使用指定的日历URL: {cal.name}")
-                        break
+            elif self.caldav_cfg.get("calendar_url"):
+                calendar_url = self.caldav_cfg["calendar_url"]
+                cal = self._calendar_url_index.get(str(calendar_url))
+                if cal is None:
+                    # 字符串不完全一致时（如末尾斜杠）按URL语义比较
+                    cal = next((c for c in calendars if c.url == calendar_url), None)
+                if cal is not None:
+                    selected_calendars.append(cal)
+                    self.logger.info(f"使用指定的日历URL: {cal.name}")
                 else:
                     self.logger.warning(f"未找到指定的日历URL，使用所有可用日历")
                     selected_calendars = calendars
@@ -531,55 +1165,34 @@ class CalSync:
                 return []
             
             # 设置时间范围
-            start_date = datetime.now() - timedelta(days=self.config["sync"]["sync_past_days"])
-            end_date = datetime.now() + timedelta(days=self.config["sync"]["sync_future_days"])
+            start_date = datetime.now() - timedelta(days=self.sync_cfg["sync_past_days"])
+            end_date = datetime.now() + timedelta(days=self.sync_cfg["sync_future_days"])
+            
+            use_sync_token = self.sync_cfg.get("use_sync_token", True)
+            if use_sync_token:
+                self._load_calendar_snapshots()
             
             # 从所有选中的日历中获取事件
             all_events = []
-            expand_recurring = self.config["sync"].get("expand_recurring", True)
             
-            for calendar in selected_calendars:
-                self.logger.info(f"正在从日历 '{calendar.name}' 获取事件...")
-                
-                try:
-                    events = calendar.search(
-                        start=start_date,
-                        end=end_date,
-                        event=True,
-                        expand=expand_recurring
-                    )
-                    
-                    calendar_event_count = 0
-                    for event in events:
-                        try:
-                            ical_data = event.data
-                            cal = ICal.from_ical(ical_data)
-                            
-                            for component in cal.walk():
-                                if component.name == "VEVENT":
-                                    event_dict = self.parse_ical_event(component)
-                                    if event_dict:
-                                        # 为每个事件添加来源日历信息
-                                        event_dict["source_calendar"] = calendar.name
-                                        event_dict["source_calendar_url"] = calendar.url
-                                        all_events.append(event_dict)
-                                        calendar_event_count += 1
-                                        
-                        except Exception as e:
-                            self.logger.warning(f"解析事件失败：{e}")
-                            continue
-                    
-                    self.logger.info(f"从日历 '{calendar.name}' 获取到 {calendar_event_count} 个事件")
-                    
-                except Exception as e:
-                    self.logger.error(f"从日历 '{calendar.name}' 获取事件失败：{e}")
-                    continue
+            # 各日历的查询是相互独立的网络请求，并行获取；ex.map保持结果按日历顺序合并
+            max_workers = max(1, min(self.sync_cfg.get("caldav_fetch_workers", 8), len(selected_calendars)))
+            with ThreadPoolExecutor(max_workers=max_workers) as ex:
+                for calendar_events in ex.map(
+                    lambda calendar: self._fetch_one_calendar(calendar, start_date, end_date, self.expand_recurring),
+                    selected_calendars
+                ):
+                    all_events.extend(calendar_events)
+            
+            if use_sync_token:
+                self._save_calendar_snapshots()
             
             self.logger.info(f"总共获取到 {len(all_events)} 个CalDAV事件")
             
             # 调试：显示所有事件的详细信息
-            for i, event in enumerate(all_events):
-                self.logger.debug(f"事件 {i+1}: {event.get('summary', 'Unknown')} (来源: {event.get('source_calendar', 'Unknown')}, UID: {event.get('uid', 'No UID')}, Key: {event.get('stable_key', 'No Key')}, 循环实例: {event.get('is_recurring_instance', False)})")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                for i, event in enumerate(all_events):
+                    self.logger.debug(f"事件 {i+1}: {event.get('summary', 'Unknown')} (来源: {event.get('source_calendar', 'Unknown')}, UID: {event.get('uid', 'No UID')}, Key: {event.get('stable_key', 'No Key')}, 循环实例: {event.get('is_recurring_instance', False)})")
             
             return all_events
             
@@ -587,6 +1200,220 @@ class CalSync:
             self.logger.error(f"获取CalDAV事件失败：{e}")
             return []
     
+    def _fetch_one_calendar(self, calendar, start_date: datetime, end_date: datetime, expand_recurring: bool) -> List[Dict]:
+        """从单个CalDAV日历获取并解析事件（在线程池中执行）"""
+        self.logger.info(f"正在从日历 '{calendar.name}' 获取事件...")
+        
+        calendar_events = []
+        try:
+            # 同一天内的查询窗口视为不变；服务器报告自上次以来无任何变化时直接复用上次结果
+            window = (start_date.date(), end_date.date(), expand_recurring)
+            calendar_url = str(calendar.url)
+            snapshot = self._calendar_snapshots.get(calendar_url)
+            markers = {}
+            if self.sync_cfg.get("use_sync_token", True):
+                # 先取变化标记再做完整查询，查询期间的变化会在下一轮被发现
+                markers, unchanged = self._query_change_markers(calendar, snapshot["markers"] if snapshot else None)
+                cache = self._parse_cache.get(calendar_url)
+                if (unchanged and snapshot["window"] == window and cache is not None
+                        and all(key in cache for key in snapshot["keys"])):
+                    snapshot["markers"] = markers
+                    calendar_events = self._expand_cached_events(calendar, calendar_url, snapshot["keys"], cache)
+                    self.logger.info(f"日历 '{calendar.name}' 自上次同步以来无变化，复用 {len(calendar_events)} 个事件")
+                    return calendar_events
+            
+            events = calendar.search(
+                start=start_date,
+                end=end_date,
+                event=True,
+                expand=expand_recurring
+            )
+            
+            # 原始数据未变化的对象直接复用上次的解析结果，只解析新增或已修改的对象
+            old_cache = self._parse_cache.get(calendar_url, {})
+            new_cache = {}
+            keys = []
+            pending = []
+            for event in events:
+                try:
+                    raw = event.data
+                    key = _raw_ical_key(raw)
+                except Exception as e:
+                    self.logger.warning(f"解析事件失败：{e}")
+                    continue
+                keys.append(key)
+                cached = old_cache.get(key)
+                if cached is not None:
+                    new_cache[key] = cached
+                elif key not in new_cache:
+                    # 先占位，同一内容在本轮只解析一次
+                    new_cache[key] = None
+                    pending.append((key, raw))
+            # 原始数据已提取，尽早释放整批响应对象：内容未变化的对象不再在内存中保留原始iCal文本
+            del events
+            
+            # iCal解析是纯Python的CPU密集型工作，事件数量超过阈值时交给进程池以绕过GIL
+            raw_items = [raw for _, raw in pending]
+            threshold = self.sync_cfg.get("parse_process_pool_threshold", 500)
+            if threshold and len(raw_items) >= threshold:
+                parsed_lists = list(self._get_parse_pool().map(_parse_ical_data, raw_items, chunksize=64))
+            else:
+                parsed_lists = map(_parse_ical_data, raw_items)
+            
+            for (key, _), parsed in zip(pending, parsed_lists):
+                new_cache[key] = parsed
+            pending_count = len(pending)
+            # 解析完成后原始文本不再需要，在展开事件副本之前释放
+            del pending, raw_items, parsed_lists
+            # 只保留本轮仍存在的对象，缓存大小随日历规模而非运行时长增长
+            self._parse_cache[calendar_url] = new_cache
+            
+            self.logger.debug("日历 '%s' 复用解析结果 %d 个，新解析 %d 个", calendar.name, len(new_cache) - pending_count, pending_count)
+            
+            calendar_events = self._expand_cached_events(calendar, calendar_url, keys, new_cache)
+            
+            self.logger.info(f"从日历 '{calendar.name}' 获取到 {len(calendar_events)} 个事件")
+            
+            # 快照只记录对象键列表，事件从解析缓存还原，不另存一份副本；
+            # markers为空表示服务器既不支持sync-token也不支持CTag，之后不再尝试
+            self._calendar_snapshots[calendar_url] = {
+                "window": window,
+                "markers": markers,
+                "keys": keys,
+            }
+            
+        except Exception as e:
+            self.logger.error(f"从日历 '{calendar.name}' 获取事件失败：{e}")
+        
+        return calendar_events
+    
+    @staticmethod
+    def _expand_cached_events(calendar, calendar_url: str, keys: List[str], cache: Dict[str, List[Dict]]) -> List[Dict]:
+        """按对象键顺序从解析缓存展开日历的事件列表"""
+        calendar_events = []
+        for key in keys:
+            for cached_event in cache[key]:
+                # 复制一份再添加来源信息，避免后续流程修改缓存中的事件
+                event_dict = dict(cached_event)
+                event_dict["source_calendar"] = calendar.name
+                event_dict["source_calendar_url"] = calendar_url
+                calendar_events.append(event_dict)
+        return calendar_events
+    
+    def _calendar_snapshot_file(self) -> str:
+        """日历快照文件路径，与同步状态文件一一对应（批量模式下各映射互不干扰）"""
+        return os.path.splitext(self.sync_state_file)[0] + "_caldav_snapshots.json"
+    
+    def _load_calendar_snapshots(self):
+        """首次获取CalDAV事件前从磁盘恢复上次保存的日历快照"""
+        path = self._calendar_snapshot_file()
+        if self._snapshots_loaded_from == path:
+            return
+        self._snapshots_loaded_from = path
+        try:
+            data = _read_json_file(path)
+            # 快照中的事件携带哈希，算法不同时作废
+            if not isinstance(data, dict) or data.get("hash_algo") != EVENT_HASH_ALGO:
+                return
+            snapshots = {url: _decode_calendar_snapshot(snapshot) for url, snapshot in data.get("snapshots", {}).items()}
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            self.logger.warning(f"读取日历快照失败，将完整查询所有日历：{e}")
+            return
+        for url, (snapshot, parsed) in snapshots.items():
+            # 快照与解析缓存成对恢复，内存中已有较新的结果时保留内存中的
+            if url not in self._calendar_snapshots:
+                self._calendar_snapshots[url] = snapshot
+                self._parse_cache.setdefault(url, parsed)
+        self.logger.debug("已从 %s 恢复 %d 个日历快照", path, len(self._calendar_snapshots))
+    
+    def _save_calendar_snapshots(self):
+        """保存日历快照（sync-token/CTag、对象键及对应的解析结果），供下次启动的进程复用"""
+        path = self._calendar_snapshot_file()
+        try:
+            snapshots = {url: _encode_calendar_snapshot(snapshot, self._parse_cache[url])
+                         for url, snapshot in self._calendar_snapshots.items() if url in self._parse_cache}
+            _atomic_write_bytes(path, _json_dumps({"hash_algo": EVENT_HASH_ALGO, "snapshots": snapshots}))
+            self._snapshots_loaded_from = path
+        except Exception as e:
+            self.logger.warning(f"保存日历快照失败：{e}")
+    
+    def _get_parse_pool(self) -> ProcessPoolExecutor:
+        """获取共享的iCal解析进程池（多个获取线程共用同一个进程池，进程数有上限）"""
+        with self._parse_pool_lock:
+            if self._parse_pool is None:
+                workers = self.sync_cfg.get("parse_process_pool_workers", min(4, os.cpu_count() or 1))
+                # 使用spawn启动子进程：调用方运行在获取线程中，多线程进程里fork可能继承被其他线程持有的锁而死锁
+                self._parse_pool = ProcessPoolExecutor(max_workers=max(1, workers),
+                                                       mp_context=multiprocessing.get_context("spawn"),
+                                                       initializer=set_event_hash_algo, initargs=(EVENT_HASH_ALGO,))
+            return self._parse_pool
+    
+    def shutdown_parse_pool(self):
+        """关闭iCal解析进程池（下次需要时重新创建）"""
+        with self._parse_pool_lock:
+            pool, self._parse_pool = self._parse_pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+    
+    def _query_change_markers(self, calendar, previous: Optional[Dict]) -> Tuple[Dict, bool]:
+        """
+        获取日历的变化标记并与上次的标记比较
+        
+        优先使用sync-token（RFC 6578），服务器不支持时回退到CTag（PROPFIND getctag）。
+        
+        Args:
+            calendar: CalDAV日历
+            previous: 上次保存的标记，首次查询为None
+            
+        Returns:
+            Tuple[Dict, bool]: (本次的标记, 服务器是否确认自上次以来无变化)
+        """
+        old_token = previous.get("sync_token") if previous else None
+        if previous is None or old_token:
+            token, changed = self._query_sync_token(calendar, old_token)
+            if token is not None:
+                return {"sync_token": token}, bool(old_token) and changed == 0
+            if old_token:
+                # 旧token已失效，重新获取当前token
+                token, _ = self._query_sync_token(calendar)
+                if token is not None:
+                    return {"sync_token": token}, False
+        
+        if previous is None or old_token or previous.get("ctag"):
+            ctag = self._query_ctag(calendar)
+            if ctag is not None:
+                return {"ctag": ctag}, bool(previous) and previous.get("ctag") == ctag
+        
+        return {}, False
+    
+    def _query_ctag(self, calendar) -> Optional[str]:
+        """读取日历的CTag；服务器不支持时返回None"""
+        try:
+            return calendar.get_property(_GetCTag())
+        except Exception as e:
+            self.logger.debug(f"日历 '{calendar.name}' CTag查询失败：{e}")
+            return None
+    
+    def _query_sync_token(self, calendar, sync_token=None) -> Tuple[Optional[str], Optional[int]]:
+        """
+        RFC 6578 sync-collection查询
+        
+        返回 (新的sync-token, 自sync_token以来新增/修改/删除的对象数)；
+        未传sync_token时只用于获取当前token。服务器不支持或token失效时返回 (None, None)。
+        """
+        try:
+            try:
+                result = calendar.objects_by_sync_token(sync_token=sync_token, load_objects=False, disable_fallback=True)
+            except TypeError:
+                # 旧版python-caldav没有disable_fallback参数，不支持时直接抛出异常
+                result = calendar.objects_by_sync_token(sync_token=sync_token, load_objects=False)
+            return result.sync_token, len(result.objects)
+        except Exception as e:
+            self.logger.debug(f"日历 '{calendar.name}' sync-token查询失败：{e}")
+            return None, None
+    
     def get_events_via_eventkit(self, calendar_names: List[str]) -> List[Dict]:
         """通过EventKit获取事件"""
         try:
@@ -597,8 +1424,8 @@ class CalSync:
             self.logger.info(f"正在从EventKit获取事件，日历：{calendar_names}")
             
             # 使用配置的时间窗
-            days_past = self.config["sync"]["sync_past_days"]
-            days_future = self.config["sync"]["sync_future_days"]
+            days_past = self.sync_cfg["sync_past_days"]
+            days_future = self.sync_cfg["sync_future_days"]
             
             # 调用EventKit桥接函数（现在返回元组）
             events, debug_info = read_events_from_eventkit(calendar_names, days_past, days_future)
@@ -623,8 +1450,9 @@ class CalSync:
             self.logger.info(f"从EventKit获取到 {len(events)} 个事件")
             
             # 调试：显示所有事件的详细信息
-            for i, event in enumerate(events):
-                self.logger.debug(f"EventKit事件 {i+1}: {event.get('summary', 'Unknown')} (来源: {event.get('source_calendar', 'Unknown')}, UID: {event.get('uid', 'No UID')}, Key: {event.get('stable_key', 'No Key')}, 循环实例: {event.get('is_recurring_instance', False)})")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                for i, event in enumerate(events):
+                    self.logger.debug(f"EventKit事件 {i+1}: {event.get('summary', 'Unknown')} (来源: {event.get('source_calendar', 'Unknown')}, UID: {event.get('uid', 'No UID')}, Key: {event.get('stable_key', 'No Key')}, 循环实例: {event.get('is_recurring_instance', False)})")
             
             return events
             
@@ -644,13 +1472,13 @@ class CalSync:
                 self.logger.error("CalDAV客户端未初始化")
                 return []
             
-            principal = self.caldav_client.principal()
-            calendars = principal.calendars()
+            self._get_calendars()
             
             caldav_calendar_names = []
             for idx in caldav_calendar_indices:
-                if 1 <= idx <= len(calendars):
-                    calendar_name = calendars[idx-1].name
+                calendar = self._calendars_by_index.get(idx)
+                if calendar is not None:
+                    calendar_name = calendar.name
                     caldav_calendar_names.append(calendar_name)
                     self.logger.info(f"CalDAV 索引 {idx} 对应日历：{calendar_name}")
                 else:
@@ -663,8 +1491,8 @@ class CalSync:
             self.logger.info(f"正在从EventKit获取事件，CalDAV索引：{caldav_calendar_indices}，对应日历：{caldav_calendar_names}")
             
             # 使用配置的时间窗
-            days_past = self.config["sync"]["sync_past_days"]
-            days_future = self.config["sync"]["sync_future_days"]
+            days_past = self.sync_cfg["sync_past_days"]
+            days_future = self.sync_cfg["sync_future_days"]
             
             # 调用EventKit桥接函数（现在返回元组）
             events, debug_info = read_events_from_eventkit_by_indices(caldav_calendar_indices, caldav_calendar_names, days_past, days_future)
@@ -689,8 +1517,9 @@ class CalSync:
             self.logger.info(f"从EventKit获取到 {len(events)} 个事件")
             
             # 调试：显示所有事件的详细信息
-            for i, event in enumerate(events):
-                self.logger.debug(f"EventKit事件 {i+1}: {event.get('summary', 'Unknown')} (来源: {event.get('source_calendar', 'Unknown')}, UID: {event.get('uid', 'No UID')}, Key: {event.get('stable_key', 'No Key')}, 循环实例: {event.get('is_recurring_instance', False)})")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                for i, event in enumerate(events):
+                    self.logger.debug(f"EventKit事件 {i+1}: {event.get('summary', 'Unknown')} (来源: {event.get('source_calendar', 'Unknown')}, UID: {event.get('uid', 'No UID')}, Key: {event.get('stable_key', 'No Key')}, 循环实例: {event.get('is_recurring_instance', False)})")
             
             return events
             
@@ -702,7 +1531,7 @@ class CalSync:
         """过滤掉持续时间过长的全天事件"""
         try:
             # 获取配置参数
-            max_hours = self.config["sync"].get("ignore_allday_events_longer_than_hours", None)
+            max_hours = self.sync_cfg.get("ignore_allday_events_longer_than_hours", None)
             
             # 如果没有设置过滤参数，返回所有事件
             if max_hours is None:
@@ -712,10 +1541,11 @@ class CalSync:
             ignored_count = 0
             
             for event in events:
-                if _should_ignore_allday_event(event, max_hours):
+                # 判断与日志共用同一次计算的持续时间
+                is_allday, duration_hours = _classify_allday(event)
+                if is_allday and duration_hours > max_hours:
                     ignored_count += 1
-                    duration_hours = _get_event_duration_hours(event)
-                    self.logger.info(f"忽略全天事件：{event.get('summary', 'Unknown')} (持续时间: {duration_hours:.1f}小时, 阈值: {max_hours}小时)")
+                    self.logger.info("忽略全天事件：%s (持续时间: %.1f小时, 阈值: %s小时)", event.get('summary', 'Unknown'), duration_hours, max_hours)
                 else:
                     filtered_events.append(event)
             
@@ -728,45 +1558,46 @@ class CalSync:
             self.logger.error(f"过滤全天事件时发生错误：{e}")
             return events
 
-    def get_source_events(self, selected_calendar_indices: List[int] = None) -> List[Dict]:
+    def get_source_events(self, selected_calendar_indices: Tuple[int, ...] = ()) -> List[Dict]:
         """统一入口：根据配置获取源事件（CalDAV + EventKit）"""
         try:
-            all_events = []
             caldav_events = []
             eventkit_events = []
             
-            # 获取CalDAV事件
-            caldav_indices = self.source_routing.get("caldav_indices", [])
-            if caldav_indices:
-                self.logger.info(f"使用CalDAV获取日历索引：{caldav_indices}")
-                caldav_events = self.get_caldav_events(caldav_indices)
-                all_events.extend(caldav_events)
-                
-                # 检查是否需要回退到EventKit
-                if self.source_routing.get("fallback_on_404", False):
-                    caldav_events = self._check_and_fallback_to_eventkit(caldav_events, caldav_indices)
-                    # 重新获取CalDAV事件（可能已经回退）
-                    all_events = caldav_events.copy()
+            # 去重：以stable_key为准，先加入的保留、后加入的忽略；各来源的事件直接并入，不再拼接中间列表
+            # 主键驻留（intern）后与同步状态中的同名键是同一对象，后续字典/集合查找可直接按身份命中
+            unique_events = {}
             
-            # 获取EventKit事件
+            def merge(events: List[Dict]):
+                setdefault = unique_events.setdefault
+                for event in events:
+                    stable_key = event.get("stable_key")
+                    if stable_key:
+                        stable_key = sys.intern(stable_key)
+                        if setdefault(stable_key, event) is event:
+                            event["stable_key"] = stable_key
+            
+            caldav_indices = self.source_routing.get("caldav_indices", [])
             eventkit_calendars = self.source_routing.get("eventkit_calendars", [])
             eventkit_indices = self.source_routing.get("eventkit_indices", [])
             
-            if eventkit_calendars:
-                self.logger.info(f"使用EventKit获取日历：{eventkit_calendars}")
-                eventkit_events = self.get_events_via_eventkit(eventkit_calendars)
-                all_events.extend(eventkit_events)
-            elif eventkit_indices:
-                self.logger.info(f"使用EventKit获取日历索引：{eventkit_indices}")
-                eventkit_events = self.get_events_via_eventkit_by_indices(eventkit_indices)
-                all_events.extend(eventkit_events)
+            if caldav_indices and (eventkit_calendars or eventkit_indices):
+                # 两个来源相互独立（网络请求与本地EventKit读取），并行获取；
+                # 日历列表先在当前线程查询一次，避免两个线程各自发起同样的PROPFIND
+                if eventkit_indices and self.caldav_client:
+                    self._get_calendars()
+                with ThreadPoolExecutor(max_workers=2) as ex:
+                    eventkit_future = ex.submit(self._fetch_eventkit_events, eventkit_calendars, eventkit_indices)
+                    caldav_events = self._fetch_caldav_source_events(caldav_indices)
+                    eventkit_events = eventkit_future.result()
+            elif caldav_indices:
+                caldav_events = self._fetch_caldav_source_events(caldav_indices)
+            else:
+                eventkit_events = self._fetch_eventkit_events(eventkit_calendars, eventkit_indices)
             
-            # 去重：以stable_key为准，后加入的忽略
-            unique_events = {}
-            for event in all_events:
-                stable_key = event.get("stable_key")
-                if stable_key and stable_key not in unique_events:
-                    unique_events[stable_key] = event
+            # CalDAV事件先并入，同一主键以CalDAV为准
+            merge(caldav_events)
+            merge(eventkit_events)
             
             final_events = list(unique_events.values())
             
@@ -781,6 +1612,26 @@ class CalSync:
             self.logger.error(f"获取源事件失败：{e}")
             return []
     
+    def _fetch_caldav_source_events(self, caldav_indices: List[int]) -> List[Dict]:
+        """获取路由到CalDAV的日历事件（配置允许时对失败的日历回退到EventKit）"""
+        self.logger.info(f"使用CalDAV获取日历索引：{caldav_indices}")
+        caldav_events = self.get_caldav_events(caldav_indices)
+        
+        # 检查是否需要回退到EventKit（返回的事件可能已包含回退结果）
+        if self.source_routing.get("fallback_on_404", False):
+            caldav_events = self._check_and_fallback_to_eventkit(caldav_events, caldav_indices)
+        return caldav_events
+    
+    def _fetch_eventkit_events(self, eventkit_calendars: List[str], eventkit_indices: List[int]) -> List[Dict]:
+        """获取路由到EventKit的日历事件：按名称指定优先，其次按CalDAV索引"""
+        if eventkit_calendars:
+            self.logger.info(f"使用EventKit获取日历：{eventkit_calendars}")
+            return self.get_events_via_eventkit(eventkit_calendars)
+        if eventkit_indices:
+            self.logger.info(f"使用EventKit获取日历索引：{eventkit_indices}")
+            return self.get_events_via_eventkit_by_indices(eventkit_indices)
+        return []
+    
     def _check_and_fallback_to_eventkit(self, caldav_events: List[Dict], caldav_indices: List[int]) -> List[Dict]:
         """检查CalDAV事件获取情况，必要时回退到EventKit"""
         try:
@@ -788,23 +1639,28 @@ class CalSync:
             if not self.caldav_client:
                 return caldav_events
             
-            principal = self.caldav_client.principal()
-            calendars = principal.calendars()
+            # 一次遍历统计各日历的事件数，而不是对每个日历重新扫描全部事件
+            event_counts = Counter(e.get("source_calendar") for e in caldav_events)
+            # 每个选中的日历都有事件且数量都不少时无需回退，不必再映射日历索引
+            if len(event_counts) >= len(set(caldav_indices)) and min(event_counts.values(), default=0) >= 5:
+                return caldav_events
+            
+            self._get_calendars()
             
             fallback_needed = False
             fallback_calendars = []
             
             for idx in caldav_indices:
-                if 1 <= idx <= len(calendars):
-                    calendar = calendars[idx-1]
+                calendar = self._calendars_by_index.get(idx)
+                if calendar is not None:
                     calendar_name = calendar.name
                     
                     # 检查该日历的事件数量是否异常少
-                    calendar_events = [e for e in caldav_events if e.get("source_calendar") == calendar_name]
+                    calendar_event_count = event_counts[calendar_name]
                     
                     # 如果事件数量少于预期阈值（比如少于5个），可能需要回退
-                    if len(calendar_events) < 5:
-                        self.logger.warning(f"日历 '{calendar_name}' 事件数量异常少（{len(calendar_events)}个），可能需要回退到EventKit")
+                    if calendar_event_count < 5:
+                        self.logger.warning(f"日历 '{calendar_name}' 事件数量异常少（{calendar_event_count}个），可能需要回退到EventKit")
                         fallback_needed = True
                         fallback_calendars.append(calendar_name)
             
@@ -815,7 +1671,8 @@ class CalSync:
                 if eventkit_events:
                     self.logger.info(f"EventKit回退成功，获取到 {len(eventkit_events)} 个事件")
                     # 替换CalDAV事件
-                    filtered_caldav_events = [e for e in caldav_events if e.get("source_calendar") not in fallback_calendars]
+                    fallback_set = set(fallback_calendars)
+                    filtered_caldav_events = [e for e in caldav_events if e.get("source_calendar") not in fallback_set]
                     return filtered_caldav_events + eventkit_events
                 else:
                     self.logger.warning("EventKit回退失败，继续使用CalDAV事件")
@@ -828,138 +1685,65 @@ class CalSync:
     
     def parse_ical_event(self, event) -> Optional[Dict]:
         """解析iCal事件"""
-        try:
-            # 获取基本字段
-            uid = event.get("UID")
-            if not uid:
-                self.logger.warning("事件缺少UID，跳过")
-                return None
-            uid = str(uid)
-            
-            # 获取循环相关字段
-            recurrence_id = event.get("RECURRENCE-ID")
-            rrule = event.get("RRULE")
-            exdate = event.get("EXDATE")
-            
-            # 创建稳定主键：UID + RECURRENCE-ID（如果有）
-            if recurrence_id:
-                # 保留完整的RECURRENCE-ID ISO格式
-                rec_id_dt = recurrence_id.dt if hasattr(recurrence_id, 'dt') else recurrence_id
-                if hasattr(rec_id_dt, 'isoformat'):
-                    rec_id_str = rec_id_dt.isoformat()
-                else:
-                    rec_id_str = str(rec_id_dt)
-                stable_key = f"{uid}#{rec_id_str}"
-                is_recurring_instance = True
-            else:
-                stable_key = uid
-                is_recurring_instance = False
-            
-            # 标准化字段
-            rrule_norm = _norm_rrule(rrule)
-            exdate_norm = _norm_exdate(exdate)
-            
-            # 处理raw_data解码
-            try:
-                raw_bytes = event.to_ical()
-                raw_data = raw_bytes.decode('utf-8', errors='ignore')
-            except Exception:
-                raw_data = str(event.to_ical(), 'utf-8', errors='ignore')
-            
-            # 在描述中添加同步标记以便在iCloud中识别
-            description = _norm_text(event.get("DESCRIPTION", ""))
-            if description:
-                sync_marker = f" [SYNC_UID:{stable_key}]"
-                if sync_marker not in description:
-                    description += sync_marker
-            else:
-                description = f"[SYNC_UID:{stable_key}]"
-            
-            # 获取并标准化时间字段
-            start_dt = event.get("DTSTART").dt if event.get("DTSTART") else None
-            end_dt = event.get("DTEND").dt if event.get("DTEND") else None
-            
-            # 对开始和结束时间进行标准化
-            if isinstance(start_dt, datetime):
-                # 转换为本地时间（去掉时区信息）
-                if start_dt.tzinfo is not None:
-                    start_dt = start_dt.astimezone().replace(tzinfo=None)
-                start_dt = _normalize_minutes_global(start_dt)
-            
-            if isinstance(end_dt, datetime):
-                # 转换为本地时间（去掉时区信息）
-                if end_dt.tzinfo is not None:
-                    end_dt = end_dt.astimezone().replace(tzinfo=None)
-                end_dt = _normalize_minutes_global(end_dt)
-            
-            event_dict = {
-                "uid": uid,
-                "stable_key": stable_key,  # 稳定主键
-                "summary": _norm_text(event.get("SUMMARY", "")),
-                "description": description,  # 包含同步标记
-                "location": _norm_text(event.get("LOCATION", "")),
-                "start": start_dt,
-                "end": end_dt,
-                "created": event.get("CREATED").dt if event.get("CREATED") else None,
-                "last_modified": event.get("LAST-MODIFIED").dt if event.get("LAST-MODIFIED") else None,
-                "recurrence_id": rec_id_str if recurrence_id else None,
-                "rrule": rrule_norm,
-                "exdate": exdate_norm,
-                "is_recurring_instance": is_recurring_instance,
-                "raw_data": raw_data
-            }
-            
-            # 生成事件哈希用于比较
-            event_dict["hash"] = self.generate_event_hash(event_dict)
-            
-            return event_dict
-            
-        except Exception as e:
-            self.logger.warning(f"解析iCal事件失败：{e}")
-            return None
+        return _parse_vevent(event)
     
     def generate_event_hash(self, event: Dict) -> str:
-        """生成事件哈希值用于比较"""
-        # 只使用稳定的语义字段，移除元数据字段避免误报修改
-        hash_fields = [
-            event.get('stable_key', event.get('uid', '')),  # 稳定主键
-            _norm_text(event.get('summary', '')),  # 重新标准化
-            _norm_text(event.get('description', '')),  # 重新标准化
-            _norm_text(event.get('location', '')),  # 重新标准化
-            event.get('rrule', '') or '',  # 已标准化
-            event.get('exdate', '') or '',  # 已标准化
-        ]
-        
-        # 统一转换为UTC ISO格式的时间
-        hash_fields.append(_to_utc_iso(event.get('start')))
-        hash_fields.append(_to_utc_iso(event.get('end')))
-        
-        # 包含RECURRENCE-ID（如果有）
-        if event.get('recurrence_id'):
-            hash_fields.append(event.get('recurrence_id'))
-        
-        hash_string = '||'.join(hash_fields)  # 使用双分隔符避免字段边界问题
-        return hashlib.md5(hash_string.encode('utf-8')).hexdigest()
+        """生成事件哈希值用于比较（仅用于变化检测，非加密用途，使用比MD5更快的BLAKE2b）"""
+        return _generate_event_hash(event)
+    
+    def _event_hash_string(self, event: Dict) -> str:
+        """拼接参与哈希的语义字段"""
+        return _event_hash_string(event)
+    
+    def _migrate_event_hashes(self, current_events: List[Dict]):
+        """
+        同步状态中的哈希由其他算法（旧版本的MD5或切换前配置的算法）生成时，迁移到当前算法
+        
+        对内容未变化的事件（当前字段按旧算法的哈希与存储值一致）直接改写为新哈希，
+        内容已变化的事件保留旧哈希，从而仍被识别为修改，避免算法切换导致全部事件被误判为修改。
+        """
+        # 未记录算法的状态文件来自MD5时期
+        stored_algo = self.sync_state.get("hash_algo", "md5")
+        if stored_algo == EVENT_HASH_ALGO:
+            return
+        
+        synced_events = self.sync_state.get("events", {})
+        old_hash = _EVENT_HASH_FUNCS.get(stored_algo)
+        if old_hash is None:
+            # 旧算法在当前环境不可用（如未安装blake3），无法比对，事件将按修改处理一次
+            self.logger.warning(f"同步状态的哈希算法 {stored_algo} 不可用，无法迁移已有哈希")
+        migrated_count = 0
+        for event in current_events:
+            stored = synced_events.get(event["stable_key"]) if old_hash else None
+            if stored and stored.get("hash") == old_hash(_event_hash_fields(event)):
+                stored["hash"] = event["hash"]
+                migrated_count += 1
+        
+        self.sync_state["hash_algo"] = EVENT_HASH_ALGO
+        self._state_dirty = True
+        self.logger.info(f"同步状态哈希算法已迁移到 {EVENT_HASH_ALGO}：{migrated_count}/{len(synced_events)} 个事件")
     
     def extract_sync_keys_from_icloud_events(self, icloud_events: List[Dict]) -> set:
         """从iCloud事件中提取同步标记的键"""
         sync_keys = set()
+        findall = _SYNC_UID_RE.findall
         
         for event in icloud_events:
             description = event.get('description', '')
             if description:
                 # 只比较描述的前200字符，与创建时的截断逻辑保持一致
-                description_to_check = description[:200]
-                # 查找同步标记 [SYNC_UID:key]
-                import re
-                matches = re.findall(r'\[SYNC_UID:([^\]]+)\]', description_to_check)
-                for match in matches:
-                    sync_keys.add(match)
+                sync_keys.update(findall(description[:200]))
         
         return sync_keys
     
-    def detect_icloud_deletions(self, caldav_events: List[Dict]) -> List[Dict]:
-        """检测iCloud中被手动删除的事件"""
+    def detect_icloud_deletions(self, caldav_events: List[Dict], icloud_events=_NOT_FETCHED) -> List[Dict]:
+        """
+        检测iCloud中被手动删除的事件
+        
+        Args:
+            caldav_events: 当前源事件
+            icloud_events: 已预先读取的iCloud事件（get_existing_events的返回值），未提供时在此读取
+        """
         try:
             self.logger.info("检测iCloud中被手动删除的事件...")
             
@@ -968,7 +1752,8 @@ class CalSync:
                 return []
             
             # 获取iCloud中的事件
-            icloud_events = self.icloud_client.get_existing_events()
+            if icloud_events is _NOT_FETCHED:
+                icloud_events = self.icloud_client.get_existing_events()
             
             # 检查是否超时
             if icloud_events == "TIMEOUT":
@@ -983,22 +1768,17 @@ class CalSync:
             
             icloud_sync_keys = self.extract_sync_keys_from_icloud_events(icloud_events)
             
-            # 获取CalDAV事件的键
-            caldav_keys = {event["stable_key"] for event in caldav_events}
-            
-            # 检查同步状态中的键
-            synced_keys = set(self.sync_state["events"].keys())
+            # 按主键索引CalDAV事件（同一主键以最后一个事件为准），不再另外构建主键集合和同步状态键的副本
+            caldav_by_key = {event["stable_key"]: event for event in caldav_events}
+            synced_events = self.sync_state["events"]
             
             # 找出应该在iCloud中但实际缺失的事件
             # 这些事件在CalDAV中存在，在同步状态中存在，但在iCloud中不存在
             missing_in_icloud = []
-            for stable_key in synced_keys & caldav_keys:
-                if stable_key not in icloud_sync_keys:
-                    # 找到对应的CalDAV事件
-                    caldav_event = next((e for e in caldav_events if e["stable_key"] == stable_key), None)
-                    if caldav_event:
-                        missing_in_icloud.append(caldav_event)
-                        self.logger.info(f"检测到iCloud中缺失的事件：{caldav_event.get('summary', 'Unknown')} (Key: {stable_key})")
+            for stable_key, caldav_event in caldav_by_key.items():
+                if stable_key in synced_events and stable_key not in icloud_sync_keys:
+                    missing_in_icloud.append(caldav_event)
+                    self.logger.info("检测到iCloud中缺失的事件：%s (Key: %s)", caldav_event.get('summary', 'Unknown'), stable_key)
             
             if missing_in_icloud:
                 self.logger.warning(f"发现 {len(missing_in_icloud)} 个在iCloud中被手动删除的事件")
@@ -1007,7 +1787,7 @@ class CalSync:
                 total_caldav_events = len(caldav_events)
                 if len(missing_in_icloud) > total_caldav_events * 0.5:
                     # 检查是否启用了跳过同步的安全功能
-                    skip_sync_on_too_many_missing = self.config["sync"].get("skip_sync_on_too_many_missing", True)
+                    skip_sync_on_too_many_missing = self.sync_cfg.get("skip_sync_on_too_many_missing", True)
                     
                     if skip_sync_on_too_many_missing:
                         self.logger.error(f"检测到过多缺失事件（{len(missing_in_icloud)}/{total_caldav_events}），可能是AppleScript检测错误")
@@ -1040,7 +1820,7 @@ class CalSync:
                 return False
             
             # 检查真正需要的方法
-            required_methods = ('create_event', 'delete_event_by_summary', 'delete_event_by_sync_uid', 'get_existing_events')
+            required_methods = ('create_events_batch', 'delete_events_by_sync_uids', 'delete_events_by_summaries', 'get_existing_events')
             missing_methods = [m for m in required_methods if not hasattr(self.icloud_client, m)]
             if missing_methods:
                 self.logger.error(f"iCloud客户端缺少必要方法: {', '.join(missing_methods)}")
@@ -1059,98 +1839,126 @@ class CalSync:
             
             self.logger.info(f"开始同步 {total_events} 个事件到iCloud日历")
             
-            # 处理新增事件
-            for event in added_events:
-                if self.icloud_client.create_event(event):
-                    stable_key = event["stable_key"]
-                    self.sync_state["events"][stable_key] = {
-                        "uid": event["uid"],
-                        "summary": event["summary"],
-                        "hash": event["hash"],
-                        "last_sync": datetime.now().isoformat()
-                    }
-                    success_count += 1
-                    self.logger.info(f"✅ 新增事件：{event.get('summary', 'Unknown')} (Key: {stable_key})")
-                else:
-                    self.logger.error(f"❌ 新增事件失败：{event.get('summary', 'Unknown')}")
+            # 批量精确删除：修改事件的旧版本和已删除事件在一次日历遍历中处理，
+            # 优先使用同步UID删除，避免误删循环事件的其他实例
+            delete_keys = [event["stable_key"] for event in modified_events]
+            delete_keys.extend(event["stable_key"] for event in deleted_events)
+            delete_results = self.icloud_client.delete_events_by_sync_uids(delete_keys) if delete_keys else {}
+            
+            # 精确删除失败的事件回退到按标题删除（但会记录警告），所有回退标题在一次日历遍历中处理
+            fallback_summaries = {}
+            for event in modified_events:
+                if not delete_results.get(event["stable_key"]):
+                    fallback_summaries[event.get('summary', 'Unknown')] = None
+            for event in deleted_events:
+                if not delete_results.get(event["stable_key"]):
+                    fallback_summaries[event.get("summary", event["stable_key"])] = None
+            summary_results = self.icloud_client.delete_events_by_summaries(list(fallback_summaries)) if fallback_summaries else {}
             
-            # 处理修改事件（删除旧事件，创建新事件）
+            # 处理修改事件的旧版本（先删除旧事件，随后与新增事件一起批量创建新事件）
             for event in modified_events:
                 stable_key = event["stable_key"]
                 event_summary = event.get('summary', 'Unknown')
                 
-                # 优先使用精确的同步UID删除旧事件，避免误删循环事件的其他实例
-                self.logger.info(f"正在删除旧事件：{event_summary} (Key: {stable_key})")
-                delete_success = self.icloud_client.delete_event_by_sync_uid(stable_key)
-                
-                if delete_success:
-                    self.logger.info(f"旧事件精确删除成功：{event_summary}")
+                self.logger.debug("正在删除旧事件：%s (Key: %s)", event_summary, stable_key)
+                if delete_results.get(stable_key):
+                    self.logger.debug("旧事件精确删除成功：%s", event_summary)
                 else:
-                    # 如果精确删除失败，回退到按标题删除（但会记录警告）
-                    self.logger.warning(f"精确删除失败，尝试按标题删除：{event_summary}")
-                    delete_success = self.icloud_client.delete_event_by_summary(event_summary)
-                    if delete_success:
-                        self.logger.warning(f"旧事件按标题删除成功：{event_summary} - 可能误删了其他同名事件")
+                    self.logger.warning("精确删除失败，已尝试按标题删除：%s", event_summary)
+                    if summary_results.get(event_summary):
+                        self.logger.warning("旧事件按标题删除成功：%s - 可能误删了其他同名事件", event_summary)
                     else:
-                        self.logger.warning(f"旧事件删除失败，继续创建新事件：{event_summary}")
-                
-                # 然后创建新事件
-                if self.icloud_client.create_event(event):
-                    self.sync_state["events"][stable_key] = {
-                        "uid": event["uid"],
-                        "summary": event["summary"],
-                        "hash": event["hash"],
-                        "last_sync": datetime.now().isoformat()
-                    }
-                    success_count += 1
-                    self.logger.info(f"✅ 修改事件：{event_summary} (Key: {stable_key})")
-                else:
-                    self.logger.error(f"❌ 修改事件失败：{event_summary}")
+                        self.logger.warning("旧事件删除失败，继续创建新事件：%s", event_summary)
             
             # 处理删除事件
             for event in deleted_events:
                 stable_key = event["stable_key"]
                 event_summary = event.get("summary", stable_key)
                 
-                # 优先使用精确的同步UID删除方法，避免误删循环事件的其他实例
-                if self.icloud_client.delete_event_by_sync_uid(stable_key):
+                if delete_results.get(stable_key):
                     if stable_key in self.sync_state["events"]:
                         del self.sync_state["events"][stable_key]
                     success_count += 1
-                    self.logger.info(f"✅ 删除事件：{event_summary} (Key: {stable_key})")
+                    self.logger.debug("✅ 删除事件：%s (Key: %s)", event_summary, stable_key)
                 else:
-                    # 如果精确删除失败，回退到按标题删除（但会记录警告）
-                    self.logger.warning(f"精确删除失败，尝试按标题删除：{event_summary}")
-                    if self.icloud_client.delete_event_by_summary(event_summary):
+                    self.logger.warning("精确删除失败，已尝试按标题删除：%s", event_summary)
+                    if summary_results.get(event_summary):
                         if stable_key in self.sync_state["events"]:
                             del self.sync_state["events"][stable_key]
                         success_count += 1
-                        self.logger.warning(f"✅ 按标题删除事件成功：{event_summary} (Key: {stable_key}) - 可能误删了其他同名事件")
+                        self.logger.warning("✅ 按标题删除事件成功：%s (Key: %s) - 可能误删了其他同名事件", event_summary, stable_key)
                     else:
-                        self.logger.error(f"❌ 删除事件失败：{event_summary}")
+                        self.logger.error("❌ 删除事件失败：%s", event_summary)
+            
+            # 批量创建：新增事件、修改后的新事件和需要恢复的事件
+            events_to_create = added_events + modified_events + icloud_recovery_events
+            batch_size = self.sync_cfg.get("icloud_batch_size", 25)
+            write_workers = self.sync_cfg.get("icloud_write_workers", 1)
+            created = self.icloud_client.create_events_batch(events_to_create, batch_size, write_workers) if events_to_create else []
+            added_results = created[:len(added_events)]
+            modified_results = created[len(added_events):len(added_events) + len(modified_events)]
+            recovery_results = created[len(added_events) + len(modified_events):]
+            # 本批写入的事件共用同一个同步时间
+            now_iso = datetime.now().isoformat()
+            
+            # 处理新增事件
+            for event, ok in zip(added_events, added_results):
+                if ok:
+                    stable_key = event["stable_key"]
+                    self.sync_state["events"][stable_key] = {
+                        "uid": event["uid"],
+                        "summary": event["summary"],
+                        "hash": event["hash"],
+                        "last_sync": now_iso
+                    }
+                    success_count += 1
+                    self.logger.debug("✅ 新增事件：%s (Key: %s)", event.get('summary', 'Unknown'), stable_key)
+                else:
+                    self.logger.error("❌ 新增事件失败：%s", event.get('summary', 'Unknown'))
+            
+            # 处理修改事件（旧事件已删除，新事件已创建）
+            for event, ok in zip(modified_events, modified_results):
+                stable_key = event["stable_key"]
+                event_summary = event.get('summary', 'Unknown')
+                if ok:
+                    self.sync_state["events"][stable_key] = {
+                        "uid": event["uid"],
+                        "summary": event["summary"],
+                        "hash": event["hash"],
+                        "last_sync": now_iso
+                    }
+                    success_count += 1
+                    self.logger.debug("✅ 修改事件：%s (Key: %s)", event_summary, stable_key)
+                else:
+                    self.logger.error("❌ 修改事件失败：%s", event_summary)
             
             # 处理iCloud恢复事件（重新创建被手动删除的事件）
-            for event in icloud_recovery_events:
-                if self.icloud_client.create_event(event):
+            for event, ok in zip(icloud_recovery_events, recovery_results):
+                if ok:
                     stable_key = event["stable_key"]
                     # 更新同步状态（这些事件本来就在状态中，只是iCloud中被删除了）
                     if stable_key in self.sync_state["events"]:
-                        self.sync_state["events"][stable_key]["last_sync"] = datetime.now().isoformat()
+                        self.sync_state["events"][stable_key]["last_sync"] = now_iso
                     success_count += 1
-                    self.logger.info(f"✅ 恢复事件：{event.get('summary', 'Unknown')} (Key: {stable_key}) - 重新创建被手动删除的事件")
+                    self.logger.debug("✅ 恢复事件：%s (Key: %s) - 重新创建被手动删除的事件", event.get('summary', 'Unknown'), stable_key)
                 else:
-                    self.logger.error(f"❌ 恢复事件失败：{event.get('summary', 'Unknown')}")
+                    self.logger.error("❌ 恢复事件失败：%s", event.get('summary', 'Unknown'))
             
             # 更新同步状态
-            self.sync_state["last_sync"] = datetime.now().isoformat()
+            self.sync_state["last_sync"] = now_iso
+            self._state_dirty = True
             self.save_sync_state()
             
             self.logger.info(f"成功同步 {success_count}/{total_events} 个事件")
             self.logger.info("iCloud同步完成")
+            if success_count < total_events:
+                # 有写入失败时下次连接重新检查日历可访问性
+                self._icloud_verified_until = 0.0
             return success_count > 0
             
         except Exception as e:
             self.logger.error(f"iCloud同步失败：{e}")
+            self._icloud_verified_until = 0.0
             return False
     
     def detect_changes(self, current_events: List[Dict]) -> Tuple[List[Dict], List[Dict], List[Dict]]:
@@ -1159,24 +1967,39 @@ class CalSync:
         modified_events = []
         deleted_events = []
         
+        # 同步状态来自旧版本哈希算法时先迁移
+        self._migrate_event_hashes(current_events)
+        
         # 使用稳定主键进行比较
-        current_keys = {event["stable_key"] for event in current_events}
-        synced_keys = set(self.sync_state["events"].keys())
+        synced_events = self.sync_state["events"]
+        current_keys = set()
+        synced_keys = synced_events.keys()
+        debug_enabled = self.logger.isEnabledFor(logging.DEBUG)
         
-        # 检测新增事件
+        # 单次遍历同时检测新增/修改事件并收集当前主键
         for event in current_events:
             stable_key = event["stable_key"]
-            if stable_key not in synced_keys:
+            current_keys.add(stable_key)
+            stored = synced_events.get(stable_key)
+            if stored is None:
                 added_events.append(event)
-                self.logger.info(f"检测到新增事件：{event.get('summary', 'Unknown')} (Key: {stable_key})")
-            else:
-                self.logger.debug(f"事件已在同步状态中：{event.get('summary', 'Unknown')} (Key: {stable_key})")
+                self.logger.info("检测到新增事件：%s (Key: %s)", event.get('summary', 'Unknown'), stable_key)
+                continue
+            
+            stored_hash = stored["hash"]
+            current_hash = event["hash"]
+            if current_hash != stored_hash:
+                modified_events.append(event)
+                self.logger.info("检测到修改事件：%s (Key: %s)", event.get('summary', 'Unknown'), stable_key)
+                self.logger.debug("哈希变化：%s... -> %s...", stored_hash[:8], current_hash[:8])
+            elif debug_enabled:
+                self.logger.debug("事件未变化：%s (Key: %s, 哈希: %s...)", event.get('summary', 'Unknown'), stable_key, current_hash[:8])
         
         # 检测删除的事件
         for stable_key in synced_keys:
             if stable_key not in current_keys:
                 # 获取要删除的事件信息用于日志
-                event_info = self.sync_state["events"].get(stable_key, {})
+                event_info = synced_events.get(stable_key, {})
                 event_summary = event_info.get('summary', stable_key)
                 event_uid = event_info.get('uid', stable_key)
                 deleted_events.append({
@@ -1184,27 +2007,23 @@ class CalSync:
                     "stable_key": stable_key,
                     "summary": event_summary
                 })
-                self.logger.info(f"检测到删除事件：{event_summary} (Key: {stable_key})")
-        
-        # 检测修改事件（基于内容比较）
-        for event in current_events:
-            stable_key = event["stable_key"]
-            if stable_key in synced_keys:
-                stored_hash = self.sync_state["events"][stable_key]["hash"]
-                current_hash = event["hash"]
-                if current_hash != stored_hash:
-                    modified_events.append(event)
-                    self.logger.info(f"检测到修改事件：{event.get('summary', 'Unknown')} (Key: {stable_key})")
-                    self.logger.debug(f"哈希变化：{stored_hash[:8]}... -> {current_hash[:8]}...")
-                else:
-                    self.logger.debug(f"事件未变化：{event.get('summary', 'Unknown')} (Key: {stable_key}, 哈希: {current_hash[:8]}...)")
-            else:
-                self.logger.debug(f"事件不在同步状态中：{event.get('summary', 'Unknown')} (Key: {stable_key})")
+                self.logger.info("检测到删除事件：%s (Key: %s)", event_summary, stable_key)
         
         return added_events, modified_events, deleted_events
     
-    def verify_sync(self, caldav_events: List[Dict]) -> bool:
-        """验证同步结果，确保CalDAV和iCloud日历基本一致"""
+    def verify_sync(self, caldav_events: List[Dict], prior: Optional[VerifyResult] = None) -> VerifyResult:
+        """
+        验证同步结果，确保CalDAV和iCloud日历基本一致
+        
+        Args:
+            caldav_events: 当前源事件
+            prior: 同一批源事件上一次的验证结果，提供时复用其中已去重的CalDAV主键和标题集合
+            
+        Returns:
+            VerifyResult: 可直接作为布尔值使用
+        """
+        caldav_keys = set()
+        caldav_summaries = set()
         try:
             self.logger.info("开始验证同步结果...")
             
@@ -1215,97 +2034,131 @@ class CalSync:
             if icloud_events is None:
                 self.logger.warning("iCloud日历不可访问，跳过验证")
                 self.logger.warning("请确保在macOS日历应用中勾选目标日历")
-                return False
+                return VerifyResult(False)
             
             # 比较事件数量
             caldav_count = len(caldav_events)
             icloud_count = len(icloud_events)
             
-            self.logger.info(f"CalDAV事件数量: {caldav_count}")
-            self.logger.info(f"iCloud事件数量: {icloud_count}")
+            self.logger.info("CalDAV事件数量: %s", caldav_count)
+            self.logger.info("iCloud事件数量: %s", icloud_count)
             
             # 允许事件数量有小的差异（±2），因为循环事件展开可能有差异
             if abs(caldav_count - icloud_count) > 2:
-                self.logger.warning(f"事件数量差异较大：CalDAV有{caldav_count}个，iCloud有{icloud_count}个")
+                self.logger.warning("事件数量差异较大：CalDAV有%s个，iCloud有%s个", caldav_count, icloud_count)
                 # 不直接返回False，而是继续检查内容匹配
             
             # 基于同步状态进行验证：检查已同步的事件是否在iCloud中存在
-            synced_keys = set(self.sync_state["events"].keys())
-            caldav_keys = {event["stable_key"] for event in caldav_events}
+            synced_events = self.sync_state["events"]
             
             # 从iCloud事件中提取同步标记的键
             icloud_sync_keys = self.extract_sync_keys_from_icloud_events(icloud_events)
             
-            self.logger.info(f"CalDAV事件键: {len(caldav_keys)}")
-            self.logger.info(f"同步状态键: {len(synced_keys)}")
-            self.logger.info(f"iCloud同步标记键: {len(icloud_sync_keys)}")
+            # iCloud中的标题集合，用于后面较宽松的标题匹配检查
+            icloud_summaries = {summary for summary in (event.get('summary', '').strip() for event in icloud_events) if summary}
+            
+            synced_caldav_count = 0
+            in_icloud_count = 0
+            common_count = 0
+            missing_in_icloud = []
+            if prior is not None and prior.caldav_keys:
+                # 源事件未变，直接在已去重的集合上重新统计与iCloud的匹配情况
+                caldav_keys = prior.caldav_keys
+                caldav_summaries = prior.caldav_summaries
+                for key in caldav_keys:
+                    synced_caldav_count += key in synced_events
+                    in_icloud_count += key in icloud_sync_keys
+                for summary in caldav_summaries:
+                    if summary in icloud_summaries:
+                        common_count += 1
+                    elif len(missing_in_icloud) < 3:
+                        missing_in_icloud.append(summary)
+            else:
+                # 单次遍历CalDAV事件，同时统计状态表覆盖数、iCloud实际覆盖数和标题匹配数（含前3个缺失的标题）
+                for event in caldav_events:
+                    summary = event.get('summary', '').strip()
+                    if summary and summary not in caldav_summaries:
+                        caldav_summaries.add(summary)
+                        if summary in icloud_summaries:
+                            common_count += 1
+                        elif len(missing_in_icloud) < 3:
+                            missing_in_icloud.append(summary)
+                    
+                    key = event["stable_key"]
+                    if key in caldav_keys:
+                        continue
+                    caldav_keys.add(key)
+                    synced_caldav_count += key in synced_events
+                    in_icloud_count += key in icloud_sync_keys
+            
+            self.logger.info("CalDAV事件键: %s", len(caldav_keys))
+            self.logger.info("同步状态键: %s", len(synced_events))
+            self.logger.info("iCloud同步标记键: %s", len(icloud_sync_keys))
             
             # 检查是否有应该同步但不在当前CalDAV事件中的事件
-            orphaned_sync_keys = synced_keys - caldav_keys
+            orphaned_sync_keys = [key for key in synced_events if key not in caldav_keys]
             if orphaned_sync_keys:
-                self.logger.warning(f"发现孤立同步状态：{len(orphaned_sync_keys)} 个事件")
+                self.logger.warning("发现孤立同步状态：%s 个事件", len(orphaned_sync_keys))
                 # 清理孤立的同步状态
                 for key in orphaned_sync_keys:
-                    del self.sync_state["events"][key]
-                self.save_sync_state()
-            
-            # 检查当前CalDAV事件中有多少已正确同步到iCloud
-            synced_caldav_keys = synced_keys & caldav_keys
-            actually_in_icloud_keys = caldav_keys & icloud_sync_keys
+                    del synced_events[key]
+                # 标记为待保存，由同步流程结束时统一写入，避免同一轮同步中重复写整个状态文件
+                self._state_dirty = True
             
             # 计算真实的同步覆盖率：CalDAV事件中有多少在iCloud中真正存在
-            real_sync_coverage = len(actually_in_icloud_keys) / max(len(caldav_keys), 1)
-            state_sync_coverage = len(synced_caldav_keys) / max(len(caldav_keys), 1)
+            real_sync_coverage = in_icloud_count / max(len(caldav_keys), 1)
+            state_sync_coverage = synced_caldav_count / max(len(caldav_keys), 1)
             
-            self.logger.info(f"状态表同步覆盖率: {state_sync_coverage:.2%} ({len(synced_caldav_keys)}/{len(caldav_keys)})")
-            self.logger.info(f"实际iCloud同步覆盖率: {real_sync_coverage:.2%} ({len(actually_in_icloud_keys)}/{len(caldav_keys)})")
+            self.logger.info("状态表同步覆盖率: %.2f%% (%s/%s)", state_sync_coverage * 100, synced_caldav_count, len(caldav_keys))
+            self.logger.info("实际iCloud同步覆盖率: %.2f%% (%s/%s)", real_sync_coverage * 100, in_icloud_count, len(caldav_keys))
             
             # 使用配置的验证阈值
-            verify_threshold = self.config["sync"].get("verify_threshold", 0.9)
-            if real_sync_coverage < verify_threshold:
-                missing_keys = caldav_keys - icloud_sync_keys
+            if real_sync_coverage < self.verify_threshold:
+                # 只在需要输出警告时才收集缺失的键
+                missing_keys = list(islice((key for key in caldav_keys if key not in icloud_sync_keys), 5))
                 if missing_keys:
-                    self.logger.warning(f"在iCloud中缺失的事件键: {list(missing_keys)[:5]}...")  # 只显示前5个
+                    self.logger.warning("在iCloud中缺失的事件键: %s...", missing_keys)  # 只显示前5个
                     
                     # 如果启用了iCloud删除覆盖功能，这些缺失的事件应该在下一次同步中被恢复
-                    override_icloud_deletions = self.config["sync"].get("override_icloud_deletions", True)
-                    if override_icloud_deletions:
+                    if self.override_icloud_deletions:
                         self.logger.info("已启用iCloud删除覆盖功能，这些缺失的事件将在下次同步时自动恢复")
                 
-                self.logger.warning(f"实际同步覆盖率较低: {real_sync_coverage:.2%}")
-                return False
+                self.logger.warning("实际同步覆盖率较低: %.2f%%", real_sync_coverage * 100)
+                return VerifyResult(False, caldav_keys, caldav_summaries)
             
             # 作为额外检查，比较标题集合（但使用更宽松的标准）
-            caldav_summaries = {event.get('summary', '').strip() for event in caldav_events if event.get('summary', '').strip()}
-            icloud_summaries = {event.get('summary', '').strip() for event in icloud_events if event.get('summary', '').strip()}
-            
-            common_summaries = caldav_summaries & icloud_summaries
-            summary_match_ratio = len(common_summaries) / max(len(caldav_summaries), 1)
+            summary_match_ratio = common_count / max(len(caldav_summaries), 1)
             
-            self.logger.info(f"标题匹配度: {summary_match_ratio:.2%} ({len(common_summaries)}/{len(caldav_summaries)})")
+            self.logger.info("标题匹配度: %.2f%% (%s/%s)", summary_match_ratio * 100, common_count, len(caldav_summaries))
             
             # 标题匹配度低于70%才认为验证失败
             if summary_match_ratio < 0.7:
-                missing_in_icloud = caldav_summaries - icloud_summaries
-                extra_in_icloud = icloud_summaries - caldav_summaries
+                # 只在输出警告时才收集iCloud中多余的标题
+                extra_in_icloud = list(islice((summary for summary in icloud_summaries if summary not in caldav_summaries), 3))
                 
                 if missing_in_icloud:
-                    self.logger.warning(f"iCloud中缺少的事件标题: {list(missing_in_icloud)[:3]}...")  # 只显示前3个
+                    self.logger.warning("iCloud中缺少的事件标题: %s...", missing_in_icloud)  # 只显示前3个
                 if extra_in_icloud:
-                    self.logger.warning(f"iCloud中多余的事件标题: {list(extra_in_icloud)[:3]}...")  # 只显示前3个
+                    self.logger.warning("iCloud中多余的事件标题: %s...", extra_in_icloud)  # 只显示前3个
                 
-                self.logger.warning(f"标题匹配度过低: {summary_match_ratio:.2%}")
-                return False
+                self.logger.warning("标题匹配度过低: %.2f%%", summary_match_ratio * 100)
+                return VerifyResult(False, caldav_keys, caldav_summaries)
             
             self.logger.info("✅ 事件内容验证通过")
-            return True
+            return VerifyResult(True, caldav_keys, caldav_summaries)
             
         except Exception as e:
             self.logger.error(f"验证同步结果时发生错误：{e}")
-            return False
+            return VerifyResult(False)
     
-    def force_resync(self, caldav_events: List[Dict]) -> bool:
-        """强制重新同步，清空iCloud日历并重新创建所有事件"""
+    def force_resync(self, caldav_events: List[Dict], prior_verify: Optional[VerifyResult] = None) -> bool:
+        """
+        强制重新同步，清空iCloud日历并重新创建所有事件
+        
+        Args:
+            caldav_events: 当前源事件
+            prior_verify: 触发本次重新同步的验证结果，重建后的验证复用其中的CalDAV侧集合
+        """
         try:
             self.logger.info("开始强制重新同步...")
             
@@ -1315,35 +2168,54 @@ class CalSync:
             
             # 重新创建所有CalDAV事件
             self.logger.info("重新创建所有事件...")
+            # 分批创建：每批事件合并为一个AppleScript调用
+            batch_size = self.sync_cfg.get("icloud_batch_size", 25)
+            write_workers = self.sync_cfg.get("icloud_write_workers", 1)
+            created = self.icloud_client.create_events_batch(caldav_events, batch_size, write_workers) if caldav_events else []
             success_count = 0
-            for event in caldav_events:
-                if self.icloud_client.create_event(event):
+            for event, ok in zip(caldav_events, created):
+                if ok:
                     success_count += 1
-                    self.logger.info(f"✅ 重新创建事件：{event.get('summary', 'Unknown')}")
                 else:
-                    self.logger.error(f"❌ 重新创建事件失败：{event.get('summary', 'Unknown')}")
-            
-            # 更新同步状态
-            self.sync_state["events"] = {}
-            for event in caldav_events:
-                stable_key = event["stable_key"]
-                if stable_key in self.sync_state["events"]:
-                    self.logger.warning(f"发现重复的稳定键：{stable_key} ({event.get('summary', 'Unknown')})")
-                self.sync_state["events"][stable_key] = {
-                    "uid": event["uid"],
-                    "summary": event["summary"],
-                    "hash": event["hash"],
-                    "last_sync": datetime.now().isoformat()
+                    self.logger.error("❌ 重新创建事件失败：%s", event.get('summary', 'Unknown'))
+            self.logger.info("✅ 重新创建事件：%s 个成功，%s 个失败", success_count, len(caldav_events) - success_count)
+            if success_count < len(caldav_events):
+                # 有写入失败时下次连接重新检查日历可访问性
+                self._icloud_verified_until = 0.0
+            
+            # 更新同步状态：本次重建的所有事件共用同一个同步时间
+            now_iso = datetime.now().isoformat()
+            columns = EventColumns.from_events(caldav_events)
+            new_events = {}
+            for stable_key, uid, summary, event_hash in zip(columns.stable_keys, columns.uids, columns.summaries, columns.hashes):
+                if stable_key in new_events:
+                    self.logger.warning("发现重复的稳定键：%s (%s)", stable_key, summary or 'Unknown')
+                new_events[stable_key] = {
+                    "uid": uid,
+                    "summary": summary,
+                    "hash": event_hash,
+                    "last_sync": now_iso
                 }
-            self.sync_state["last_sync"] = datetime.now().isoformat()
-            self.save_sync_state()
+            self.sync_state["events"] = new_events
+            self.sync_state.pop("events_digest", None)
+            self.sync_state["last_sync"] = now_iso
+            self.sync_state["hash_algo"] = EVENT_HASH_ALGO
+            self._state_dirty = True
+            # 状态写入放到后台线程，与下面的iCloud验证重叠执行
+            writer = self._save_sync_state_in_background()
             
             self.logger.info(f"同步状态已更新：{len(self.sync_state['events'])} 个事件")
             
             self.logger.info(f"强制重新同步完成：成功创建 {success_count}/{len(caldav_events)} 个事件")
             
             # 再次验证
-            if self.verify_sync(caldav_events):
+            try:
+                verified = self.verify_sync(caldav_events, prior_verify)
+            finally:
+                if writer is not None:
+                    writer.join()
+            
+            if verified:
                 self.logger.info("✅ 强制重新同步验证通过")
                 return True
             else:
@@ -1352,23 +2224,49 @@ class CalSync:
                 
         except Exception as e:
             self.logger.error(f"强制重新同步失败：{e}")
+            self._icloud_verified_until = 0.0
             return False
+        finally:
+            self._flush_sync_state()
     
-    def sync_calendars(self, selected_calendar_indices: List[int] = None):
-        """执行日历同步"""
+    def _connect_and_fetch_icloud(self, reuse_connections: bool = False):
+        """
+        连接iCloud，并在启用删除覆盖时预先读取iCloud中的现有事件
+        
+        Returns:
+            (是否连接成功, iCloud事件；未读取时为_NOT_FETCHED)
+        """
+        if not (reuse_connections and self.icloud_client) and not self.connect_icloud():
+            return False, _NOT_FETCHED
+        if not self.override_icloud_deletions:
+            return True, _NOT_FETCHED
+        return True, self.icloud_client.get_existing_events()
+    
+    def sync_calendars(self, selected_calendar_indices: Tuple[int, ...] = (), reuse_connections: bool = False):
+        """
+        执行日历同步
+        
+        Args:
+            selected_calendar_indices: 选择的日历索引
+            reuse_connections: 为True时复用已建立的连接（批量模式下由编排器共享CalDAV连接）
+        """
         try:
             self.logger.info("开始日历同步...")
             
-            # 连接CalDAV
-            if not self.connect_caldav():
-                return False
+            # CalDAV与iCloud两侧相互独立：iCloud的连接和现有事件读取放到后台线程，
+            # 与CalDAV的连接和源事件获取重叠执行
+            with ThreadPoolExecutor(max_workers=1) as ex:
+                icloud_future = ex.submit(self._connect_and_fetch_icloud, reuse_connections)
+                
+                # 连接CalDAV并获取源事件（CalDAV + EventKit）
+                caldav_ok = (reuse_connections and self.caldav_client) or self.connect_caldav()
+                current_events = self.get_source_events(selected_calendar_indices) if caldav_ok else []
+                
+                icloud_ok, icloud_events = icloud_future.result()
             
-            # 连接iCloud
-            if not self.connect_icloud():
+            if not caldav_ok or not icloud_ok:
                 return False
             
-            # 获取源事件（CalDAV + EventKit）
-            current_events = self.get_source_events(selected_calendar_indices)
             if not current_events:
                 self.logger.info("没有找到需要同步的事件")
                 return True
@@ -1377,14 +2275,25 @@ class CalSync:
             if self.config.get("backup", {}).get("enabled", False):
                 self.backup_caldav_events(current_events)
             
+            # 源事件的(主键, 哈希)与上次确认无变化时完全一致，且无需检查iCloud端的手动删除时，直接跳过；
+            # 需要检查手动删除时摘要不可能用于跳过，不计算也不记录
+            events_digest = None
+            if not self.override_icloud_deletions:
+                events_digest = _aggregate_event_digest(EventColumns.from_events(current_events))
+                if events_digest == self.sync_state.get("events_digest"):
+                    self.logger.info("源事件与上次同步时一致，跳过变化检测")
+                    return True
+            # 本轮可能修改同步状态，先作废旧摘要，待确认一致后再重新记录
+            if self.sync_state.pop("events_digest", None) is not None:
+                self._state_dirty = True
+            
             # 检测变化
             added, modified, deleted = self.detect_changes(current_events)
             
             # 检测iCloud中被手动删除的事件
             icloud_deletions = []
-            override_icloud_deletions = self.config["sync"].get("override_icloud_deletions", True)
-            if override_icloud_deletions:
-                icloud_deletions = self.detect_icloud_deletions(current_events)
+            if self.override_icloud_deletions:
+                icloud_deletions = self.detect_icloud_deletions(current_events, icloud_events)
                 
                 # 检查是否超时或检测到过多缺失事件
                 if icloud_deletions == "TIMEOUT":
@@ -1397,54 +2306,52 @@ class CalSync:
                     return True
             
             total_changes = len(added) + len(modified) + len(deleted) + len(icloud_deletions)
-            self.logger.info(f"检测到变化：新增 {len(added)} 个，修改 {len(modified)} 个，删除 {len(deleted)} 个，iCloud恢复 {len(icloud_deletions)} 个")
-            
-            # 显示详细的变化统计
-            if added:
-                self.logger.info("新增事件详情:")
-                for event in added:
-                    self.logger.info(f"  + {event.get('summary', 'Unknown')} (Key: {event.get('stable_key')})")
-            
-            if modified:
-                self.logger.info("修改事件详情:")
-                for event in modified:
-                    self.logger.info(f"  ~ {event.get('summary', 'Unknown')} (Key: {event.get('stable_key')})")
-            
-            if deleted:
-                self.logger.info("删除事件详情:")
-                for event in deleted:
-                    self.logger.info(f"  - {event.get('summary', 'Unknown')} (Key: {event.get('stable_key')})")
-            
-            if icloud_deletions:
-                self.logger.info("iCloud恢复事件详情:")
-                for event in icloud_deletions:
-                    self.logger.info(f"  ↻ {event.get('summary', 'Unknown')} (Key: {event.get('stable_key')}) - 恢复被手动删除的事件")
+            self.logger.info("检测到变化：新增 %s 个，修改 %s 个，删除 %s 个，iCloud恢复 %s 个", len(added), len(modified), len(deleted), len(icloud_deletions))
+            
+            # 显示详细的变化统计：每类变化合并为一条多行日志
+            for title, prefix, suffix, events in (
+                ("新增事件详情:", "+", "", added),
+                ("修改事件详情:", "~", "", modified),
+                ("删除事件详情:", "-", "", deleted),
+                ("iCloud恢复事件详情:", "↻", " - 恢复被手动删除的事件", icloud_deletions),
+            ):
+                if events and self.logger.isEnabledFor(logging.INFO):
+                    lines = [title]
+                    lines.extend(f"  {prefix} {event['summary']} (Key: {event['stable_key']}){suffix}" for event in events)
+                    self.logger.info("\n".join(lines))
             
             # 同步到iCloud
             if total_changes > 0:
                 if self.sync_to_icloud(added, modified, deleted, icloud_deletions):
                     self.logger.info("日历同步完成")
                     # 验证同步结果
-                    if self.verify_sync(current_events):
+                    verify_result = self.verify_sync(current_events)
+                    if verify_result:
                         self.logger.info("✅ 同步验证通过：CalDAV和iCloud日历完全一致")
                         return True
                     else:
                         self.logger.error("❌ 同步验证失败：CalDAV和iCloud日历不一致")
                         # 尝试强制重新同步
                         self.logger.info("尝试强制重新同步...")
-                        return self.force_resync(current_events)
+                        return self.force_resync(current_events, prior_verify=verify_result)
                 else:
                     self.logger.error("日历同步失败")
                     return False
             else:
                 self.logger.info("没有检测到变化，跳过同步")
+                # 只在确认同步状态与源事件完全一致时记录摘要，失败或部分成功的同步不会让下一轮跳过
+                if events_digest is not None:
+                    self.sync_state["events_digest"] = events_digest
+                    self._state_dirty = True
                 return True
                 
         except Exception as e:
             self.logger.error(f"同步过程中发生错误：{e}")
             return False
+        finally:
+            self._flush_sync_state()
     
-    def run_sync(self, selected_calendar_indices: List[int] = None):
+    def run_sync(self, selected_calendar_indices: Tuple[int, ...] = ()):
         """运行一次同步"""
         self.logger.info("=" * 50)
         self.logger.info("开始执行日历同步")
@@ -1457,23 +2364,98 @@ class CalSync:
     
     def start_scheduled_sync(self):
         """启动定时同步"""
-        interval = self.config["sync"]["interval_minutes"]
+        interval = self.sync_cfg["interval_minutes"]
         self.logger.info(f"启动定时同步，间隔：{interval} 分钟")
         
-        # 立即执行一次同步
-        self._run_sync_with_batch_check()
-        
-        # 设置定时任务
-        schedule.every(interval).minutes.do(self._run_sync_with_batch_check)
+        # SIGTERM（launchd/守护进程停止）与Ctrl+C走同样的退出流程
+        def _handle_stop(signum, frame):
+            raise KeyboardInterrupt
+        try:
+            signal.signal(signal.SIGTERM, _handle_stop)
+        except ValueError:
+            # 只能在主线程注册信号处理
+            pass
         
         try:
+            # 立即执行一次同步，之后每次同步结束后间隔interval分钟再执行；
+            # 等待期间只在到点或配置文件被修改时醒来，修改配置无需重启
+            next_run = time.monotonic()
             while True:
-                schedule.run_pending()
-                time.sleep(60)  # 每分钟检查一次
+                remaining = next_run - time.monotonic()
+                if remaining > 0:
+                    if self._wait_for_config_change(remaining) and self._reload_config():
+                        new_interval = self.sync_cfg["interval_minutes"]
+                        if new_interval != interval:
+                            self.logger.info(f"同步间隔已更新：{interval} -> {new_interval} 分钟")
+                            next_run += (new_interval - interval) * 60
+                            interval = new_interval
+                    continue
+                
+                self._run_sync_with_batch_check()
+                next_run = time.monotonic() + interval * 60
         except KeyboardInterrupt:
             self.logger.info("收到停止信号，正在退出...")
         except Exception as e:
             self.logger.error(f"定时同步发生错误：{e}")
+        finally:
+            self.shutdown_parse_pool()
+    
+    def _wait_for_config_change(self, timeout: float) -> bool:
+        """
+        阻塞等待配置文件被修改，最长timeout秒
+        
+        macOS上使用kqueue监听文件，一次系统调用等到修改或超时；不支持kqueue的平台直接休眠到超时，
+        醒来后比较修改时间。
+        
+        Returns:
+            bool: 配置文件是否被修改
+        """
+        try:
+            mtime_before = os.stat(self.config_file).st_mtime
+        except OSError:
+            mtime_before = None
+        
+        if hasattr(select, "kqueue"):
+            try:
+                fd = os.open(self.config_file, os.O_RDONLY)
+            except OSError:
+                fd = None
+            if fd is not None:
+                kq = select.kqueue()
+                try:
+                    # 编辑器常以“写临时文件再重命名”的方式保存，因此同时关注删除和重命名
+                    fflags = select.KQ_NOTE_WRITE | select.KQ_NOTE_EXTEND | select.KQ_NOTE_DELETE | select.KQ_NOTE_RENAME
+                    kevent = select.kevent(fd, filter=select.KQ_FILTER_VNODE,
+                                           flags=select.KQ_EV_ADD | select.KQ_EV_CLEAR, fflags=fflags)
+                    if kq.control([kevent], 1, timeout):
+                        # 给保存操作留一点时间完成重命名/写入
+                        time.sleep(0.5)
+                        return True
+                    return False
+                finally:
+                    kq.close()
+                    os.close(fd)
+        
+        time.sleep(timeout)
+        try:
+            return os.stat(self.config_file).st_mtime != mtime_before
+        except OSError:
+            return False
+    
+    def _reload_config(self) -> bool:
+        """重新加载配置文件；文件缺失或格式错误时保留当前配置"""
+        try:
+            config = _read_json_file(self.config_file)
+        except Exception as e:
+            self.logger.warning(f"重新加载配置失败，继续使用当前配置：{e}")
+            return False
+        
+        # 源路由可能由命令行参数覆盖，保持启动时的设置
+        config["source_routing"] = self.source_routing
+        self.config = config
+        self._bind_config()
+        self.logger.info("检测到配置文件修改，已重新加载配置")
+        return True
     
     def _run_sync_with_batch_check(self):
         """运行同步，支持批量编排模式检查"""
@@ -1558,8 +2540,7 @@ class CalSync:
                 # 移除同步标记，保持原始描述
                 description = event_data['description']
                 # 移除 [SYNC_UID:xxx] 标记
-                import re
-                description = re.sub(r'\s*\[SYNC_UID:[^\]]+\]', '', description)
+                description = _SYNC_UID_STRIP_RE.sub('', description)
                 # 限制描述长度，避免过长的内容
                 if len(description) > 10000:  # 限制为10KB
                     description = description[:10000] + "... [内容已截断]"
@@ -1603,8 +2584,7 @@ class CalSync:
                 # 移除同步标记，保持原始描述
                 description = main_event['description']
                 # 移除 [SYNC_UID:xxx] 标记
-                import re
-                description = re.sub(r'\s*\[SYNC_UID:[^\]]+\]', '', description)
+                description = _SYNC_UID_STRIP_RE.sub('', description)
                 # 限制描述长度，避免过长的内容
                 if len(description) > 10000:  # 限制为10KB
                     description = description[:10000] + "... [内容已截断]"
@@ -1646,12 +2626,8 @@ class CalSync:
     def _extract_rrule_from_description(self, description: str) -> Dict:
         """从描述中提取循环规则"""
         try:
-            import re
-            
             # 查找循环周期信息
-            # 例如："重复周期：2025/09/26-2029/07/20 10:30-11:30, 每周 (周五)"
-            pattern = r'重复周期：.*?每周\s*\(([^)]+)\)'
-            match = re.search(pattern, description)
+            match = _WEEKLY_REPEAT_RE.search(description)
             
             if match:
                 weekday = match.group(1)
@@ -1689,8 +2665,7 @@ class CalSync:
                 # 移除同步标记，保持原始描述
                 description = event_data['description']
                 # 移除 [SYNC_UID:xxx] 标记
-                import re
-                description = re.sub(r'\s*\[SYNC_UID:[^\]]+\]', '', description)
+                description = _SYNC_UID_STRIP_RE.sub('', description)
                 # 限制描述长度，避免过长的内容
                 if len(description) > 10000:  # 限制为10KB
                     description = description[:10000] + "... [内容已截断]"
@@ -1793,8 +2768,7 @@ class CalSync:
                     # 移除同步标记，保持原始描述
                     description = event_data['description']
                     # 移除 [SYNC_UID:xxx] 标记
-                    import re
-                    description = re.sub(r'\s*\[SYNC_UID:[^\]]+\]', '', description)
+                    description = _SYNC_UID_STRIP_RE.sub('', description)
                     if description.strip():
                         event.add('description', description.strip())
                 if event_data.get('location'):
@@ -1988,8 +2962,7 @@ class CalSync:
             
             # 检查上次备份时间
             if os.path.exists(self.backup_state_file):
-                with open(self.backup_state_file, 'r', encoding='utf-8') as f:
-                    backup_state = json.load(f)
+                backup_state = _read_json_file(self.backup_state_file)
                 last_backup = backup_state.get("last_backup")
                 if last_backup:
                     last_backup_time = datetime.fromisoformat(last_backup)
@@ -2154,66 +3127,62 @@ class CalSync:
             return False
 
 
+def _index_list(value: str) -> Tuple[int, ...]:
+    """argparse类型：解析逗号分隔的日历索引，如 "1,3,5" -> (1, 3, 5)"""
+    try:
+        return tuple(int(x) for x in value.split(',') if x.strip())
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的日历索引格式：{value}。请使用逗号分隔的数字，如：1,3,5")
+
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(description="CalDAV到iCloud日历同步工具")
     parser.add_argument("--config", default="config.json", help="配置文件路径")
     parser.add_argument("--once", action="store_true", help="只执行一次同步")
     parser.add_argument("--daemon", action="store_true", help="以守护进程模式运行")
-    parser.add_argument("--select-calendars", type=str, help="选择要同步的日历索引，用逗号分隔，如：1,3,5")
+    parser.add_argument("--select-calendars", type=_index_list, default=(), help="选择要同步的日历索引，用逗号分隔，如：1,3,5")
     parser.add_argument("--list-calendars", action="store_true", help="列出所有可用日历")
     parser.add_argument("--backup", action="store_true", help="强制执行一次备份")
     parser.add_argument("--force-resync", action="store_true", help="强制重新同步：清空iCloud日历并重新创建所有事件")
-    parser.add_argument("--caldav-indices", type=str, help="指定使用CalDAV的日历索引，用逗号分隔，如：1,3")
+    parser.add_argument("--caldav-indices", type=_index_list, help="指定使用CalDAV的日历索引，用逗号分隔，如：1,3")
     parser.add_argument("--eventkit-calendars", type=str, help="指定使用EventKit的日历名称，用逗号分隔，如：同事共享B,第三方服务")
-    parser.add_argument("--eventkit-indices", type=str, help="指定使用EventKit的日历索引（对应CalDAV索引），用逗号分隔，如：5")
+    parser.add_argument("--eventkit-indices", type=_index_list, help="指定使用EventKit的日历索引（对应CalDAV索引），用逗号分隔，如：5")
     
     args = parser.parse_args()
     
-    # 解析命令行参数
+    # 解析命令行参数（索引列表已由argparse校验并转换）
     caldav_indices = None
     eventkit_calendars = None
     eventkit_indices = None
     
     if args.caldav_indices:
-        try:
-            caldav_indices = [int(x.strip()) for x in args.caldav_indices.split(',')]
-            print(f"CalDAV日历索引: {caldav_indices}")
-        except ValueError as e:
-            print(f"错误：无效的CalDAV日历索引格式。请使用逗号分隔的数字，如：1,3")
-            return
+        caldav_indices = list(args.caldav_indices)
+        print(f"CalDAV日历索引: {caldav_indices}")
     
     if args.eventkit_calendars:
         eventkit_calendars = [x.strip() for x in args.eventkit_calendars.split(',')]
         print(f"EventKit日历名称: {eventkit_calendars}")
     
     if args.eventkit_indices:
-        try:
-            eventkit_indices = [int(x.strip()) for x in args.eventkit_indices.split(',')]
-            print(f"EventKit日历索引: {eventkit_indices}")
-        except ValueError as e:
-            print(f"错误：无效的EventKit日历索引格式。请使用逗号分隔的数字，如：5")
-            return
+        eventkit_indices = list(args.eventkit_indices)
+        print(f"EventKit日历索引: {eventkit_indices}")
     
     # 创建同步器
     syncer = CalSync(args.config, caldav_indices, eventkit_calendars, eventkit_indices)
+    # 各种运行模式在多处返回，统一在退出时关闭解析进程池
+    atexit.register(syncer.shutdown_parse_pool)
     
-    # 解析日历选择参数（向后兼容）
-    selected_calendar_indices = None
-    if args.select_calendars:
-        try:
-            selected_calendar_indices = [int(x.strip()) for x in args.select_calendars.split(',')]
-            print(f"选择的日历索引: {selected_calendar_indices}")
-        except ValueError as e:
-            print(f"错误：无效的日历索引格式。请使用逗号分隔的数字，如：1,3,5")
-            return
+    # 日历选择参数（向后兼容）
+    selected_calendar_indices = args.select_calendars
+    if selected_calendar_indices:
+        print(f"选择的日历索引: {list(selected_calendar_indices)}")
     
     # 如果只是列出日历
     if args.list_calendars:
         if syncer.connect_caldav():
             # 获取所有日历并显示
-            principal = syncer.caldav_client.principal()
-            calendars = principal.calendars()
+            calendars = syncer._get_calendars()
             
             if calendars:
                 print(f"\n找到 {len(calendars)} 个可用日历:")
@@ -42,6 +42,8 @@ class CalSyncDaemon:
         self.syncer = None
         self.config = None
         self._stop_requested = False
+        # 停止请求事件：等待下次同步的线程阻塞在该事件上，收到停止请求时立即醒来，无需轮询
+        self._stop_event = threading.Event()
         
         # 设置日志
         self.setup_logging()
@@ -94,6 +96,7 @@ class CalSyncDaemon:
         self.logger.info(f"收到信号 {signum}，正在停止守护进程...")
         self._stop_requested = True
         self.running = False
+        self._stop_event.set()
     
     def write_pid(self):
         """写入PID文件"""
@@ -337,11 +340,8 @@ class CalSyncDaemon:
                 # 等待下次同步
                 self.logger.info(f"等待 {interval_minutes} 分钟后进行下次同步...")
                 
-                # 分段等待，以便能够响应停止请求
-                wait_seconds = 0
-                while wait_seconds < interval_seconds and self.running and not self._stop_requested:
-                    time.sleep(min(10, interval_seconds - wait_seconds))
-                    wait_seconds += 10
+                # 阻塞到下次同步时间，期间收到停止请求立即返回
+                self._stop_event.wait(interval_seconds)
                 
             except Exception as e:
                 error_count += 1
@@ -349,11 +349,9 @@ class CalSyncDaemon:
                 self.update_status(error_count=error_count)
                 
                 # 错误后等待较短时间再重试
-                wait_seconds = 0
-                while wait_seconds < 60 and self.running and not self._stop_requested:
-                    time.sleep(min(10, 60 - wait_seconds))
-                    wait_seconds += 10
+                self._stop_event.wait(60)
         
+        self.syncer.shutdown_parse_pool()
         self.logger.info("同步工作线程结束")
     
     def start(self):
@@ -370,6 +368,7 @@ class CalSyncDaemon:
         # 设置运行标志
         self.running = True
         self._stop_requested = False
+        self._stop_event.clear()
         
         # 启动同步线程
         self.sync_thread = threading.Thread(target=self.sync_worker, daemon=False)
@@ -403,6 +402,7 @@ class CalSyncDaemon:
         # 设置运行标志
         self.running = True
         self._stop_requested = False
+        self._stop_event.clear()
         
         # 启动同步线程
         self.sync_thread = threading.Thread(target=self.sync_worker, daemon=False)
@@ -419,8 +419,8 @@ class CalSyncDaemon:
         
         # 主循环
         try:
-            while self.running and not self._stop_requested:
-                time.sleep(1)
+            # 信号处理器设置停止事件后返回，不再每秒醒来检查标志
+            self._stop_event.wait()
         except KeyboardInterrupt:
             self.logger.info("收到中断信号，正在停止...")
             self.running = False
@@ -431,6 +431,7 @@ class CalSyncDaemon:
             # 清理资源
             self.running = False
             self._stop_requested = True
+            self._stop_event.set()
             if self.sync_thread and self.sync_thread.is_alive():
                 self.sync_thread.join(timeout=5)
             self.remove_pid()
@@ -445,6 +446,7 @@ class CalSyncDaemon:
         # 设置停止标志
         self.running = False
         self._stop_requested = True
+        self._stop_event.set()
         
         try:
             # 如果同步线程正在运行，等待其结束
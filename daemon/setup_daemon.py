@@ -21,7 +21,7 @@ def check_dependencies():
         return False
     
     # 检查必要的包
-    required_packages = ['psutil', 'schedule', 'caldav', 'icalendar', 'keyring']
+    required_packages = ['psutil', 'caldav', 'icalendar', 'keyring']
     missing_packages = []
     
     for package in required_packages:
@@ -5,13 +5,30 @@ iCloud日历集成模块
 使用AppleScript与macOS日历应用交互
 """
 
+import re
 import subprocess
 import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, date
 from typing import List, Dict, Optional
 
 
+# 分钟数标准化查找表：个位数0,1,2 -> 0（向前调整），3-7 -> 5，8,9 -> 下一个0（60表示进位到下一小时）
+_NORMALIZED_MINUTES = tuple(
+    (m // 10) * 10 if m % 10 <= 2 else (m // 10) * 10 + 5 if m % 10 <= 7 else (m // 10 + 1) * 10
+    for m in range(60)
+)
+
+# iCloud事件描述中的同步标记 [SYNC_UID:key]
+_SYNC_UID_RE = re.compile(r'\[SYNC_UID:([^\]]+)\]')
+
+# 日历应用依次处理收到的Apple事件：进程内所有AppleScript调用（包括批量模式下各映射的调用）共用这把锁依次执行，
+# 避免多个映射的脚本同时排队在日历应用中，使排在后面的脚本在等待期间就耗尽超时时间
+_APPLESCRIPT_LOCK = threading.Lock()
+
+
 class ICloudIntegration:
     """iCloud日历集成类"""
     
@@ -29,7 +46,12 @@ class ICloudIntegration:
             os.makedirs(self.applescript_dir)
     
     def _run_applescript(self, script: str, timeout: int = 60) -> tuple[bool, str]:
-        """运行AppleScript"""
+        """运行AppleScript：与进程内其他AppleScript调用依次执行，超时时间从获得执行权后开始计算"""
+        with _APPLESCRIPT_LOCK:
+            return self._execute_applescript(script, timeout)
+    
+    def _execute_applescript(self, script: str, timeout: int = 60) -> tuple[bool, str]:
+        """运行AppleScript，调用方需已持有_APPLESCRIPT_LOCK"""
         try:
             result = subprocess.run(
                 ["osascript", "-e", script],
@@ -111,12 +133,199 @@ class ICloudIntegration:
     
     def create_event(self, event: Dict) -> bool:
         """创建日历事件"""
+        fields = self._prepare_event_fields(event)
+        if fields is None:
+            return False
+        
+        # 使用properties语法的AppleScript，直接使用绝对时间
+        script = f'''
+        tell application "Calendar"
+            try
+                set targetCalendar to calendar "{self.calendar_name}"
+                {self._make_event_statement(fields)}
+                return "Event created successfully"
+            on error errMsg
+                return "Error: " & errMsg
+            end try
+        end tell
+        '''
+        
+        success, result = self._run_applescript(script)
+        if success:
+            self.logger.info(f"创建事件结果：{result}")
+            return "Error:" not in result
+        return False
+    
+    def create_events_batch(self, events: List[Dict], chunk_size: int = 25, max_workers: int = 1) -> List[bool]:
+        """
+        批量创建日历事件：每个分块只执行一次AppleScript，减少osascript进程启动和Apple事件往返
+        
+        分块内每个事件在独立的try块中创建，单个事件失败不影响同一分块中的其他事件。
+        多个分块可以并发执行：日历应用会依次处理收到的Apple事件，并发只是让osascript进程的启动和
+        脚本编译与其他分块的写入重叠。
+        
+        Args:
+            events: 事件列表
+            chunk_size: 每个AppleScript中创建的事件数量
+            max_workers: 同时执行的分块数量
+            
+        Returns:
+            List[bool]: 与events一一对应的创建结果
+        """
+        results = [False] * len(events)
+        chunk_size = max(1, chunk_size)
+        
+        # 先在当前线程生成所有分块的脚本，日期无效的事件直接记为失败
+        jobs = []
+        for chunk_start in range(0, len(events), chunk_size):
+            chunk = events[chunk_start:chunk_start + chunk_size]
+            
+            statements = []
+            positions = []
+            for offset, event in enumerate(chunk):
+                fields = self._prepare_event_fields(event)
+                if fields is None:
+                    continue
+                statements.append(f'''
+                try
+                    {self._make_event_statement(fields)}
+                    set resultText to resultText & "1"
+                on error
+                    set resultText to resultText & "0"
+                end try''')
+                positions.append(chunk_start + offset)
+            
+            if not statements:
+                continue
+            
+            script = f'''
+        tell application "Calendar"
+            try
+                set targetCalendar to calendar "{self.calendar_name}"
+            on error errMsg
+                return "Error: " & errMsg
+            end try
+            set resultText to ""
+            {"".join(statements)}
+            return "RESULTS:" & resultText
+        end tell
+        '''
+            jobs.append((positions, script))
+        
+        # 日历应用依次处理Apple事件，并发的分块需要排队等待前面的分块完成，
+        # 超时时间按同时在途的分块数放大，避免已排队的分块在写入中途超时而被整体记为失败
+        in_flight = max(1, min(max_workers, len(jobs)))
+        
+        def run_chunk(job):
+            positions, script = job
+            return self._execute_applescript(script, timeout=max(60, 5 * len(positions)) * in_flight)
+        
+        # 整个批量写入只获取一次执行权：本批次的分块之间可以并发，但不与其他映射的AppleScript交错
+        with _APPLESCRIPT_LOCK:
+            if in_flight > 1:
+                with ThreadPoolExecutor(max_workers=in_flight) as ex:
+                    outcomes = list(ex.map(run_chunk, jobs))
+            else:
+                outcomes = list(map(run_chunk, jobs))
+        
+        failed_positions = []
+        for (positions, _), (success, result) in zip(jobs, outcomes):
+            if not success or not result.startswith("RESULTS:"):
+                self.logger.error(f"批量创建事件失败（{len(positions)} 个事件）：{result}")
+                failed_positions.extend(positions)
+                continue
+            
+            flags = result[len("RESULTS:"):]
+            for position, flag in zip(positions, flags):
+                results[position] = flag == "1"
+            self.logger.info(f"批量创建事件结果：{flags.count('1')}/{len(positions)} 个成功")
+        
+        if failed_positions:
+            self._recover_failed_creates(events, failed_positions, results)
+        
+        return results
+    
+    def _recover_failed_creates(self, events: List[Dict], positions: List[int], results: List[bool]):
+        """
+        核对失败分块中的事件：分块超时或中途出错时，部分事件可能已经写入日历，
+        直接记为失败会让下次同步重复创建。重新读取目标日历中的同步标记，已存在的事件记为成功，
+        确认不存在的事件逐个重新创建；无法读取同步标记时保持失败，避免重复创建。
+        """
+        existing_uids = self.get_existing_sync_uids()
+        if existing_uids is None:
+            self.logger.warning(f"无法读取目标日历的同步标记，{len(positions)} 个事件保持失败状态")
+            return
+        
+        found = recreated = 0
+        for position in positions:
+            match = _SYNC_UID_RE.search(events[position].get('description', '') or '')
+            if match is None:
+                # 没有同步标记的事件无法核对是否已写入，保持失败
+                continue
+            if match.group(1) in existing_uids:
+                results[position] = True
+                found += 1
+            elif self.create_event(events[position]):
+                results[position] = True
+                recreated += 1
+        
+        self.logger.info(f"核对失败分块：{found} 个事件已存在，{recreated} 个事件逐个重新创建成功，"
+                         f"共 {len(positions)} 个")
+    
+    def get_existing_sync_uids(self) -> Optional[set]:
+        """
+        读取目标日历中所有事件描述里的同步标记
+        
+        Returns:
+            set: 同步UID集合，读取失败时返回None
+        """
+        script = f'''
+        tell application "Calendar"
+            try
+                set targetCalendar to calendar "{self.calendar_name}"
+                set descriptionList to description of every event of targetCalendar
+            on error errMsg
+                return "Error: " & errMsg
+            end try
+        end tell
+        
+        set descriptionTexts to {{}}
+        repeat with d in descriptionList
+            if contents of d is not missing value then set end of descriptionTexts to (contents of d) as string
+        end repeat
+        set AppleScript's text item delimiters to linefeed
+        set resultText to descriptionTexts as string
+        set AppleScript's text item delimiters to ""
+        return "DESCRIPTIONS:" & resultText
+        '''
+        
+        success, result = self._run_applescript(script, timeout=300)
+        if not success or not result.startswith("DESCRIPTIONS:"):
+            self.logger.error(f"读取同步标记失败：{result}")
+            return None
+        return set(_SYNC_UID_RE.findall(result))
+    
+    def _make_event_statement(self, fields: Dict) -> str:
+        """生成在targetCalendar中创建事件的AppleScript语句"""
+        return (
+            f'make new event at end of events of targetCalendar with properties '
+            f'{{summary:"{fields["summary"]}", description:"{fields["description"]}", location:"{fields["location"]}", '
+            f'start date:date "{fields["start"]}", end date:date "{fields["end"]}"}}'
+        )
+    
+    def _prepare_event_fields(self, event: Dict) -> Optional[Dict]:
+        """
+        准备创建事件所需的字段：转义字符串、截断描述并标准化时间
+        
+        Returns:
+            Dict: 已转义的summary/description/location和格式化的start/end时间字符串，日期无效时返回None
+        """
         # 确保有结束日期
         start_date, end_date = self._ensure_end_date(event.get("start"), event.get("end"))
         
         if not start_date or not end_date:
             self.logger.warning(f"事件日期无效：{event.get('summary')}")
-            return False
+            return None
         
         # 使用更安全的方式处理字符串
         summary = self._escape_string(event.get('summary', ''))
@@ -192,26 +401,13 @@ class ICloudIntegration:
         start_time_str = start_date_normalized.strftime("%Y-%m-%d %H:%M:%S")
         end_time_str = end_date_normalized.strftime("%Y-%m-%d %H:%M:%S")
         
-        # 使用properties语法的AppleScript，直接使用绝对时间
-        script = f'''
-        tell application "Calendar"
-            try
-                set targetCalendar to calendar "{self.calendar_name}"
-                set startTime to date "{start_time_str}"
-                set endTime to date "{end_time_str}"
-                make new event at end of events of targetCalendar with properties {{summary:"{summary}", description:"{description}", location:"{location}", start date:startTime, end date:endTime}}
-                return "Event created successfully"
-            on error errMsg
-                return "Error: " & errMsg
-            end try
-        end tell
-        '''
-        
-        success, result = self._run_applescript(script)
-        if success:
-            self.logger.info(f"创建事件结果：{result}")
-            return "Error:" not in result
-        return False
+        return {
+            "summary": summary,
+            "description": description,
+            "location": location,
+            "start": start_time_str,
+            "end": end_time_str
+        }
     
     def update_event(self, event: Dict) -> bool:
         """更新日历事件"""
@@ -333,6 +529,61 @@ class ICloudIntegration:
             return "Error:" not in result and "Deleted" in result
         return False
     
+    def delete_events_by_summaries(self, summaries: List[str]) -> Dict[str, bool]:
+        """
+        根据事件标题批量删除事件：只遍历一次目标日历，一次AppleScript删除所有匹配任一标题的事件
+        
+        与delete_event_by_summary的语义一致：标题包含给定文本即删除，脚本执行成功即视为删除成功。
+        
+        Args:
+            summaries: 事件标题列表
+            
+        Returns:
+            Dict[str, bool]: 每个标题的删除结果
+        """
+        if not summaries:
+            return {}
+        
+        summary_items = ", ".join(f'"{self._escape_string(summary)}"' for summary in summaries)
+        script = f'''
+        tell application "Calendar"
+            try
+                set targetCalendar to calendar "{self.calendar_name}"
+                set summaryList to {{{summary_items}}}
+                set eventList to events of targetCalendar
+                set deletedCount to 0
+                
+                -- 创建要删除的事件列表
+                set eventsToDelete to {{}}
+                repeat with evt in eventList
+                    set eventSummary to summary of evt
+                    repeat with targetSummary in summaryList
+                        if eventSummary contains (contents of targetSummary) then
+                            set end of eventsToDelete to evt
+                            exit repeat
+                        end if
+                    end repeat
+                end repeat
+                
+                -- 删除找到的事件
+                repeat with evt in eventsToDelete
+                    delete evt
+                    set deletedCount to deletedCount + 1
+                end repeat
+                
+                return "Deleted " & deletedCount & " events"
+            on error errMsg
+                return "Error: " & errMsg
+            end try
+        end tell
+        '''
+        
+        success, result = self._run_applescript(script, timeout=max(60, 2 * len(summaries)))
+        ok = success and "Error:" not in result and "Deleted" in result
+        if success:
+            self.logger.info(f"根据标题批量删除事件结果（{len(summaries)} 个标题）：{result}")
+        return {summary: ok for summary in summaries}
+    
     def delete_event_by_sync_uid(self, sync_uid: str) -> bool:
         """根据同步UID精确删除特定事件"""
         script = f'''
@@ -370,35 +621,98 @@ class ICloudIntegration:
             return "Error:" not in result and "Deleted" in result
         return False
     
-    def get_existing_events(self) -> List[Dict]:
-        """获取现有事件列表"""
+    def delete_events_by_sync_uids(self, sync_uids: List[str]) -> Dict[str, bool]:
+        """
+        根据同步UID批量精确删除事件：只遍历一次目标日历，一次AppleScript删除所有匹配事件
+        
+        与delete_event_by_sync_uid的语义一致：脚本执行成功即视为删除成功（包括未找到匹配事件的情况）。
+        
+        Args:
+            sync_uids: 同步UID列表
+            
+        Returns:
+            Dict[str, bool]: 每个同步UID的删除结果
+        """
+        if not sync_uids:
+            return {}
+        
+        markers = ", ".join(f'"[SYNC_UID:{self._escape_string(uid)}]"' for uid in sync_uids)
         script = f'''
         tell application "Calendar"
             try
                 set targetCalendar to calendar "{self.calendar_name}"
-                set eventCount to count of events of targetCalendar
-                set eventList to ""
-                repeat with evt in events of targetCalendar
-                    set eventSummary to summary of evt
+                set markerList to {{{markers}}}
+                set eventList to events of targetCalendar
+                set deletedCount to 0
+                
+                -- 创建要删除的事件列表
+                set eventsToDelete to {{}}
+                repeat with evt in eventList
                     set eventDescription to description of evt
-                    set eventLocation to location of evt
-                    set eventStart to start date of evt
-                    set eventEnd to end date of evt
-                    
-                    set eventInfo to eventSummary & "|" & eventDescription & "|" & eventLocation & "|" & (eventStart as string) & "|" & (eventEnd as string)
-                    if eventList is "" then
-                        set eventList to eventInfo
-                    else
-                        set eventList to eventList & "|||" & eventInfo
+                    if eventDescription is not missing value then
+                        repeat with marker in markerList
+                            if eventDescription contains (contents of marker) then
+                                set end of eventsToDelete to evt
+                                exit repeat
+                            end if
+                        end repeat
                     end if
                 end repeat
-                return "COUNT:" & eventCount & "|||EVENTS:" & eventList
+                
+                -- 删除找到的事件
+                repeat with evt in eventsToDelete
+                    delete evt
+                    set deletedCount to deletedCount + 1
+                end repeat
+                
+                return "Deleted " & deletedCount & " events"
             on error errMsg
                 return "Error: " & errMsg
             end try
         end tell
         '''
         
+        success, result = self._run_applescript(script, timeout=max(60, 2 * len(sync_uids)))
+        ok = success and "Error:" not in result and "Deleted" in result
+        if success:
+            self.logger.info(f"根据同步UID批量删除事件结果（{len(sync_uids)} 个UID）：{result}")
+        return {uid: ok for uid in sync_uids}
+    
+    def get_existing_events(self) -> List[Dict]:
+        """获取现有事件列表"""
+        # 每个属性用一次 "of every event" 批量读取（每个属性一次Apple Event，而不是每个事件每个属性一次），
+        # 再在脚本内用text item delimiters一次性拼接，避免逐个事件字符串累加的平方级开销
+        script = f'''
+        on asText(v)
+            if v is missing value then return ""
+            return v as string
+        end asText
+        
+        tell application "Calendar"
+            try
+                set targetCalendar to calendar "{self.calendar_name}"
+                set summaryList to summary of every event of targetCalendar
+                set descriptionList to description of every event of targetCalendar
+                set locationList to location of every event of targetCalendar
+                set startList to start date of every event of targetCalendar
+                set endList to end date of every event of targetCalendar
+            on error errMsg
+                return "Error: " & errMsg
+            end try
+        end tell
+        
+        set eventCount to count of summaryList
+        set eventInfos to {{}}
+        repeat with i from 1 to eventCount
+            set end of eventInfos to asText(item i of summaryList) & "|" & asText(item i of descriptionList) & "|" & asText(item i of locationList) & "|" & asText(item i of startList) & "|" & asText(item i of endList)
+        end repeat
+        
+        set AppleScript's text item delimiters to "|||"
+        set eventList to eventInfos as string
+        set AppleScript's text item delimiters to ""
+        return "COUNT:" & eventCount & "|||EVENTS:" & eventList
+        '''
+        
         success, result = self._run_applescript(script, timeout=300)  # 5分钟超时
         if success and "Error:" not in result:
             try:
@@ -428,7 +742,8 @@ class ICloudIntegration:
                                         events.append(event)
                 
                 self.logger.info(f"获取到 {len(events)} 个iCloud事件")
-                self.logger.debug(f"iCloud事件详情: {[e['summary'] for e in events]}")
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug(f"iCloud事件详情: {[e['summary'] for e in events]}")
                 return events
             except Exception as e:
                 self.logger.error(f"解析iCloud事件失败：{e}")
@@ -569,27 +884,11 @@ class ICloudIntegration:
         if dt is None:
             return dt
         
-        # 获取当前分钟数
-        current_minute = dt.minute
-        
-        # 将分钟数标准化为个位数为0或5
-        # 例如：09:29 -> 09:30, 09:44 -> 09:45, 09:59 -> 10:00
-        minute_ones_digit = current_minute % 10
-        
-        if minute_ones_digit <= 2:
-            # 0,1,2 -> 0 (向前调整)
-            normalized_minute = (current_minute // 10) * 10
-        elif minute_ones_digit <= 7:
-            # 3,4,5,6,7 -> 5 (调整到5)
-            normalized_minute = (current_minute // 10) * 10 + 5
-        else:
-            # 8,9 -> 下一个0 (进位到下一个整点)
-            normalized_minute = ((current_minute // 10) + 1) * 10
-            # 如果分钟数超过59，需要进位到下一小时
-            if normalized_minute >= 60:
-                # 使用timedelta进行安全的进位，避免小时数超过23
-                dt = dt.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
-                return dt
+        # 查表得到标准化后的分钟数，例如：09:29 -> 09:30, 09:44 -> 09:45, 09:59 -> 10:00
+        normalized_minute = _NORMALIZED_MINUTES[dt.minute]
+        if normalized_minute >= 60:
+            # 进位到下一小时：使用timedelta进行安全的进位，避免小时数超过23
+            return dt.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
         
         # 返回标准化后的时间
         return dt.replace(minute=normalized_minute, second=0, microsecond=0)
@@ -10,6 +10,8 @@ import uuid
 from datetime import datetime, timedelta, date, timezone
 from typing import List, Dict, Optional
 
+from icloud_integration import _NORMALIZED_MINUTES
+
 try:
     import objc
     from Foundation import NSDate, NSDateFormatter, NSPredicate, NSLocale
@@ -30,9 +32,9 @@ def _norm_text(s: Optional[str]) -> str:
     """标准化文本字段：去除多余空白、换行等"""
     if s is None:
         return ""
-    s = str(s).strip()
-    # 折叠所有空白为单空格
-    return ' '.join(s.split())
+    # 折叠所有空白为单空格（str.split()本身会去掉首尾空白，无需先strip；
+    # 与 CalSync 一致不改用正则：split/join在C层一次完成，比re.sub快数倍）
+    return ' '.join(str(s).split())
 
 
 def _to_utc_iso(dt) -> str:
@@ -60,27 +62,11 @@ def _normalize_minutes_global(dt: datetime) -> datetime:
     if dt is None:
         return dt
     
-    # 获取当前分钟数
-    current_minute = dt.minute
-    
-    # 将分钟数标准化为个位数为0或5
-    # 例如：09:29 -> 09:30, 09:44 -> 09:45, 09:59 -> 10:00
-    minute_ones_digit = current_minute % 10
-    
-    if minute_ones_digit <= 2:
-        # 0,1,2 -> 0 (向前调整)
-        normalized_minute = (current_minute // 10) * 10
-    elif minute_ones_digit <= 7:
-        # 3,4,5,6,7 -> 5 (调整到5)
-        normalized_minute = (current_minute // 10) * 10 + 5
-    else:
-        # 8,9 -> 下一个0 (进位到下一个整点)
-        normalized_minute = ((current_minute // 10) + 1) * 10
-        # 如果分钟数超过59，需要进位到下一小时
-        if normalized_minute >= 60:
-            # 使用timedelta进行安全的进位，避免小时数超过23
-            dt = dt.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
-            return dt
+    # 查表得到标准化后的分钟数，例如：09:29 -> 09:30, 09:44 -> 09:45, 09:59 -> 10:00
+    normalized_minute = _NORMALIZED_MINUTES[dt.minute]
+    if normalized_minute >= 60:
+        # 进位到下一小时：使用timedelta进行安全的进位，避免小时数超过23
+        return dt.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
     
     # 返回标准化后的时间
     return dt.replace(minute=normalized_minute, second=0, microsecond=0)
@@ -96,10 +82,9 @@ def _convert_nsdate_to_datetime(nsdate) -> Optional[datetime]:
         timestamp = nsdate.timeIntervalSinceReferenceDate()
         # 转换为从1970年1月1日开始的时间戳
         unix_timestamp = timestamp + 978307200  # 2001-1970的秒数差
-        dt = datetime.fromtimestamp(unix_timestamp, tz=timezone.utc)
-        # 转换为本地时间并标准化
-        dt_local = dt.astimezone().replace(tzinfo=None)
-        return _normalize_minutes_global(dt_local)
+        # fromtimestamp直接得到本地naive时间（按各时间点的实际偏移处理夏令时），
+        # 省去先构造UTC时间再astimezone()转换的开销
+        return _normalize_minutes_global(datetime.fromtimestamp(unix_timestamp))
     except Exception:
         return None
 
@@ -327,7 +312,7 @@ def read_events_from_eventkit(
         事件字典列表，包含以下字段：
         uid, stable_key, summary, description(需附加 [SYNC_UID:stable_key]),
         location, start, end, created, last_modified, recurrence_id,
-        rrule, exdate, is_recurring_instance, raw_data, hash
+        rrule, exdate, is_recurring_instance, hash
         永远不会返回None
     """
     logger = logging.getLogger(__name__)
@@ -499,7 +484,6 @@ def _convert_eventkit_event_to_dict(ek_event: EKEvent) -> Optional[Dict]:
             "exdate": "",  # EventKit 不直接提供 EXDATE，暂时为空
             "is_recurring_instance": is_recurring_instance,
             "source_calendar": f"EventKit:{calendar_name}",
-            "raw_data": f"EventKit:{uid}"  # 简化的原始数据标识
         }
         
         # 生成事件哈希（复用 CalSync 的逻辑）
@@ -512,6 +496,21 @@ def _convert_eventkit_event_to_dict(ek_event: EKEvent) -> Optional[Dict]:
         return None
 
 
+try:
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
+
+# 事件哈希算法，由 CalSync 按配置通过 set_event_hash_algo 同步
+_event_hash_algo = "blake2b-128"
+
+
+def set_event_hash_algo(algo: str):
+    """设置事件哈希算法（与 CalSync 保持一致）"""
+    global _event_hash_algo
+    _event_hash_algo = algo
+
+
 def _generate_event_hash(event: Dict) -> str:
     """生成事件哈希值用于比较（复用 CalSync 的逻辑）"""
     import hashlib
@@ -519,9 +518,9 @@ def _generate_event_hash(event: Dict) -> str:
     # 只使用稳定的语义字段，移除元数据字段避免误报修改
     hash_fields = [
         event.get('stable_key', event.get('uid', '')),  # 稳定主键
-        _norm_text(event.get('summary', '')),  # 重新标准化
-        _norm_text(event.get('description', '')),  # 重新标准化
-        _norm_text(event.get('location', '')),  # 重新标准化
+        event.get('summary') or '',  # 解析时已标准化
+        event.get('description') or '',  # 解析时已标准化（含同步标记）
+        event.get('location') or '',  # 解析时已标准化
         event.get('rrule', '') or '',  # 已标准化
         event.get('exdate', '') or '',  # 已标准化
     ]
@@ -534,8 +533,11 @@ def _generate_event_hash(event: Dict) -> str:
     if event.get('recurrence_id'):
         hash_fields.append(event.get('recurrence_id'))
     
-    hash_string = '||'.join(hash_fields)  # 使用双分隔符避免字段边界问题
-    return hashlib.md5(hash_string.encode('utf-8')).hexdigest()
+    # 拼接为单个缓冲区后一次性计算哈希，使用双分隔符避免字段边界问题
+    payload = '||'.join(hash_fields).encode('utf-8')
+    if _event_hash_algo == "blake3-128" and blake3 is not None:
+        return blake3(payload).hexdigest(length=16)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
 
 
 def test_eventkit_access():